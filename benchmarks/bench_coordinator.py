@@ -0,0 +1,37 @@
+"""End-to-end refreshes of the coordinator against the stand-in server."""
+import pytest
+from homeassistant.core import HomeAssistant
+
+from custom_components.budgetthuis.const import DOMAIN
+
+CONTRACTS = [1, 10, 100]
+
+
+@pytest.mark.parametrize("contracts", CONTRACTS)
+async def test_refresh_cold(hass: HomeAssistant, setup_coordinator, async_benchmark, contracts: int) -> None:
+    """Discover contracts and fetch every tariff horizon, as on a first start."""
+    coordinator = await setup_coordinator(contracts)
+    nutsservices = hass.data[DOMAIN][coordinator.config_entry.entry_id]['nutsservices']
+
+    async def refresh():
+        coordinator.contracts_discovered_at = None
+        coordinator.shared_caches.caches.clear()
+        coordinator.optimizers.clear()
+        coordinator.analyzers.clear()
+        nutsservices._responses.clear()
+        return await coordinator._async_update_data()
+
+    data = await async_benchmark(refresh)
+
+    assert len(data) == contracts
+
+
+@pytest.mark.parametrize("contracts", CONTRACTS)
+async def test_refresh_cached(hass: HomeAssistant, setup_coordinator, async_benchmark, contracts: int) -> None:
+    """An hourly refresh while every contract still has a valid cached horizon."""
+    coordinator = await setup_coordinator(contracts)
+    await coordinator._async_update_data()
+
+    data = await async_benchmark(coordinator._async_update_data)
+
+    assert len(data) == contracts
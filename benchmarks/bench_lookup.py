@@ -0,0 +1,83 @@
+"""Current tariff lookups in a cache holding the full history retention."""
+import pytest
+from datetime import timedelta
+from homeassistant.util import utcnow
+
+from custom_components.budgetthuis.analytics import PriceAnalyzer
+from custom_components.budgetthuis.const import (AGGREGATION_DAILY, AGGREGATION_HOURLY, AGGREGATION_NONE,
+                                                 TARIFF_HISTORY_RETENTION)
+from custom_components.budgetthuis.parser import parse_hourly_tariff
+from custom_components.budgetthuis.schedule import Schedule
+from custom_components.budgetthuis.series import price_series
+from custom_components.budgetthuis.tariff_cache import TariffCache
+from payloads import TIME_ZONE, hourly_tariff_payload
+
+
+@pytest.fixture
+def tariff_cache() -> TariffCache:
+    """Return a cache with the retained history and tomorrow's tariffs."""
+    now = utcnow().replace(minute=0, second=0, microsecond=0)
+    days = TARIFF_HISTORY_RETENTION.days + 2
+    timeline = parse_hourly_tariff(hourly_tariff_payload(days, now - TARIFF_HISTORY_RETENTION))
+
+    return TariffCache(timeline, now)
+
+
+def test_current_tariff(benchmark, tariff_cache: TariffCache) -> None:
+    now = utcnow()
+
+    tariff = benchmark(tariff_cache.current, now)
+
+    assert tariff is not None
+
+
+def test_current_price(benchmark, tariff_cache: TariffCache) -> None:
+    now = utcnow()
+
+    price = benchmark(tariff_cache.timeline.price_at, now)
+
+    assert price is not None
+
+
+def test_prices_next_day(benchmark, tariff_cache: TariffCache) -> None:
+    now = utcnow()
+
+    prices = benchmark(tariff_cache.timeline.prices, now, now + timedelta(days=1))
+
+    assert len(prices) >= 24
+
+
+@pytest.mark.parametrize("aggregation", [AGGREGATION_NONE, AGGREGATION_HOURLY, AGGREGATION_DAILY])
+def test_price_series_history(benchmark, tariff_cache: TariffCache, aggregation: str) -> None:
+    """What the get_tariffs service does for the whole retained history."""
+    timeline = tariff_cache.timeline
+
+    series = benchmark(
+        price_series, timeline, timeline.first_start, timeline.last_end, "total_gross", aggregation, TIME_ZONE
+    )
+
+    assert series
+
+
+def test_price_analytics(benchmark, tariff_cache: TariffCache) -> None:
+    """Statistics of the horizon after a fetch, with the 7-day averages read from the history."""
+    now = utcnow()
+
+    def analyse():
+        analyzer = PriceAnalyzer()
+        analyzer.update(tariff_cache.timeline, now)
+        return analyzer.at(now)
+
+    analytics = benchmark(analyse)
+
+    assert analytics.day.average is not None
+
+
+def test_threshold_schedule(benchmark, tariff_cache: TariffCache) -> None:
+    """Flips of a price below threshold sensor, computed once per fetch."""
+    now = utcnow()
+    prices = tariff_cache.timeline.columns["total_gross"]
+
+    schedule = benchmark(Schedule.from_timeline, tariff_cache.timeline, now, lambda index: prices[index] < 0.3)
+
+    assert schedule.next_change(now) is not None
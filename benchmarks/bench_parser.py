@@ -0,0 +1,28 @@
+"""Decoding and parsing of realistic Nutsservices responses."""
+import json
+import pytest
+
+from custom_components.budgetthuis.parser import loads, parse_contracts, parse_hourly_tariff
+from payloads import hourly_tariff_payload, product_picker_payload
+
+
+@pytest.mark.parametrize("days", [2, 7, 31])
+def test_parse_hourly_tariff(benchmark, days: int) -> None:
+    """What Nutsservices.hourly_tariff does with a response body."""
+    payload = hourly_tariff_payload(days)
+    body = json.dumps(payload).encode()
+
+    timeline = benchmark(lambda: parse_hourly_tariff(loads(body)))
+
+    # Days around a DST change are 23 or 25 hours long.
+    assert len(timeline) == len(payload["electricityTariffs"])
+
+
+@pytest.mark.parametrize("contracts", [1, 10, 100])
+def test_parse_contracts(benchmark, contracts: int) -> None:
+    """What Nutsservices.all_contracts does with a response body."""
+    body = json.dumps(product_picker_payload(contracts)).encode()
+
+    parsed = benchmark(lambda: parse_contracts(loads(body)))
+
+    assert len(parsed) == contracts
@@ -0,0 +1,35 @@
+"""Pushing new states to all sensors when the tariff hour changes."""
+import pytest
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.util import utcnow
+from pytest_homeassistant_custom_component.common import MockEntityPlatform
+
+from custom_components.budgetthuis.const import DOMAIN
+from custom_components.budgetthuis.sensor import SENSOR_TYPES, BudgetThuisSensor
+
+
+@pytest.mark.parametrize("contracts", [1, 10, 100])
+async def test_tariff_boundary_fan_out(
+        hass: HomeAssistant, setup_coordinator, async_benchmark, contracts: int
+) -> None:
+    """Resolve the current tariffs once and write the state of every sensor which changed."""
+    coordinator = await setup_coordinator(contracts)
+    await coordinator.async_refresh()
+
+    sensors = [
+        BudgetThuisSensor(coordinator, description, coordinator.config_entry, contract['contract'])
+        for contract in coordinator.data.values()
+        for description in SENSOR_TYPES
+    ]
+    platform = MockEntityPlatform(hass, domain="sensor", platform_name=DOMAIN)
+    await platform.async_add_entities(sensors)
+
+    @callback
+    def tariff_boundary() -> None:
+        # Stands in for the boundary timer firing, so the armed timer is released first.
+        coordinator._async_cancel_tariff_boundary()
+        coordinator._handle_tariff_boundary(utcnow())
+
+    await async_benchmark(tariff_boundary)
+
+    assert len(hass.states.async_entity_ids("sensor")) == contracts * len(SENSOR_TYPES)
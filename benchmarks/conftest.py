@@ -0,0 +1,118 @@
+"""Fixtures of the benchmark suite.
+
+Coroutines and callbacks are timed on the event loop of the hass fixture:
+pytest-benchmark runs in an executor thread and hands every round to the
+loop, which costs a few microseconds per round on top of the measurement.
+"""
+import asyncio
+import pytest
+import time
+from aiohttp.test_utils import TestServer
+from collections.abc import Awaitable, Callable
+from homeassistant.config_entries import current_entry
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.aiohttp_client import async_create_clientsession
+from homeassistant.helpers.config_entry_oauth2_flow import LocalOAuth2Implementation, OAuth2Session
+from homeassistant.util.async_ import run_callback_threadsafe
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+from typing import Any
+
+from custom_components.budgetthuis import AsyncConfigEntryAuth
+from custom_components.budgetthuis.budget_thuis import BudgetThuis
+from custom_components.budgetthuis.client import ConnectionStats
+from custom_components.budgetthuis.const import (BUDGETTHUIS_AUTH_PATH, BUDGETTHUIS_CLIENT_ID, BUDGETTHUIS_TOKEN_PATH,
+                                                 CONF_MAX_CONCURRENT_FETCHES, DOMAIN)
+from custom_components.budgetthuis.coordinator import BudgetThuisCoordinator
+from custom_components.budgetthuis.nutsservices import Nutsservices
+from custom_components.budgetthuis.store import BudgetThuisStore
+from fake_server import FakeServer, FakeServerOptions, fake_jwt
+
+
+@pytest.fixture(autouse=True)
+def enable_event_loop_debug(event_loop: asyncio.AbstractEventLoop) -> None:
+    """Keep asyncio debug mode off, its bookkeeping would dominate the timings."""
+    event_loop.set_debug(False)
+
+
+@pytest.fixture
+def async_benchmark(hass: HomeAssistant, benchmark) -> Callable[[Callable[[], Any]], Awaitable[Any]]:
+    """Benchmark a coroutine function or callback on the event loop of hass."""
+
+    async def _run(target: Callable[[], Any]) -> Any:
+        def _round() -> Any:
+            if asyncio.iscoroutinefunction(target):
+                return asyncio.run_coroutine_threadsafe(target(), hass.loop).result()
+
+            return run_callback_threadsafe(hass.loop, target).result()
+
+        return await hass.async_add_executor_job(benchmark, _round)
+
+    return _run
+
+
+@pytest.fixture
+async def stub_server(socket_enabled):
+    """Start stand-in API servers on localhost."""
+    servers: list[TestServer] = []
+
+    async def _start(**options) -> TestServer:
+        server = TestServer(FakeServer(FakeServerOptions(**options)).app())
+        await server.start_server()
+        servers.append(server)
+        return server
+
+    yield _start
+
+    for server in servers:
+        await server.close()
+
+
+@pytest.fixture
+async def setup_coordinator(hass: HomeAssistant, stub_server):
+    """Build a coordinator, with its entry data, talking to a stand-in server."""
+    coordinators: list[BudgetThuisCoordinator] = []
+
+    async def _setup(contracts: int) -> BudgetThuisCoordinator:
+        server = await stub_server(contracts=contracts)
+        base_url = str(server.make_url("")).rstrip("/")
+
+        token = {
+            "access_token": fake_jwt(3600),
+            "refresh_token": "stand-in",
+            "token_type": "Bearer",
+            "expires_in": 3600,
+            "expires_at": time.time() + 3600,
+        }
+        entry = MockConfigEntry(
+            domain=DOMAIN,
+            data={"auth_implementation": DOMAIN, "token": token},
+            options={CONF_MAX_CONCURRENT_FETCHES: 16},
+        )
+        entry.add_to_hass(hass)
+
+        implementation = LocalOAuth2Implementation(
+            hass, DOMAIN, BUDGETTHUIS_CLIENT_ID, "", base_url + BUDGETTHUIS_AUTH_PATH, base_url + BUDGETTHUIS_TOKEN_PATH
+        )
+        client_session = async_create_clientsession(hass)
+        budget_thuis = BudgetThuis(client_session, token["access_token"], base_url)
+        nutsservices = Nutsservices(client_session, token["access_token"], base_url)
+        auth = AsyncConfigEntryAuth(OAuth2Session(hass, entry, implementation), budget_thuis, nutsservices)
+
+        current_entry.set(entry)
+        coordinator = BudgetThuisCoordinator(hass, BudgetThuisStore(hass, entry.entry_id))
+        coordinators.append(coordinator)
+
+        hass.data.setdefault(DOMAIN, {})[entry.entry_id] = {
+            'auth': auth,
+            'budget_thuis': budget_thuis,
+            'nutsservices': nutsservices,
+            'connection_stats': ConnectionStats(),
+            'coordinator': coordinator,
+        }
+
+        return coordinator
+
+    yield _setup
+
+    for coordinator in coordinators:
+        await coordinator.async_shutdown()
@@ -0,0 +1,277 @@
+"""Stand-in for the Budget Thuis accounts and Nutsservices APIs.
+
+Serves the token, userinfo, productPicker and hourlytariff endpoints from
+generated payloads, with configurable latency, error and rate limit rates,
+so refreshes, retries and scaling can be exercised without network access.
+It can also proxy to the real APIs and record the responses as fixtures,
+which are then replayed offline.
+
+    python benchmarks/fake_server.py --port 8080 --contracts 3 --days 2 \\
+        --latency 0.05 --error-rate 0.05 --rate-limit-rate 0.02
+
+    python benchmarks/fake_server.py --record benchmarks/fixtures
+    python benchmarks/fake_server.py --replay benchmarks/fixtures
+
+Point Home Assistant at it from configuration.yaml:
+
+    budgetthuis:
+      accounts_url: http://localhost:8080
+      api_url: http://localhost:8080
+
+Request counters are served as JSON from /_stats.
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import random
+import sys
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+
+from aiohttp import ClientSession, web
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from payloads import TIME_ZONE, hourly_tariff_payload, product_picker_payload  # noqa: E402
+
+ACCOUNTS_URL = "https://accounts.budgetthuis.nl"
+API_URL = "https://app.api.nutsservices.nl"
+TOKEN_LIFETIME = 3600
+
+# Headers which must not be copied between the proxied request and response.
+HOP_HEADERS = {"host", "content-length", "content-encoding", "transfer-encoding", "connection"}
+
+
+@dataclass
+class FakeServerOptions:
+    contracts: int = 1
+    days: int = 2
+    latency: float = 0.0
+    latency_jitter: float = 0.0
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    retry_after: int = 1
+    token_lifetime: int = TOKEN_LIFETIME
+    seed: int = 0
+    record: Path | None = None
+    replay: Path | None = None
+    accounts_upstream: str = ACCOUNTS_URL
+    api_upstream: str = API_URL
+
+
+@dataclass
+class FakeServerStats:
+    requests: Counter = field(default_factory=Counter)
+    errors: int = 0
+    rate_limited: int = 0
+    not_modified: int = 0
+    bytes_sent: int = 0
+
+    def as_dict(self) -> dict:
+        return {
+            "requests": dict(self.requests),
+            "errors": self.errors,
+            "rate_limited": self.rate_limited,
+            "not_modified": self.not_modified,
+            "bytes_sent": self.bytes_sent,
+        }
+
+
+def fake_jwt(lifetime: int) -> str:
+    """Return an unsigned JWT, the integration only reads its exp claim."""
+    def encode(value: dict) -> str:
+        return base64.urlsafe_b64encode(json.dumps(value).encode()).rstrip(b"=").decode()
+
+    return ".".join([
+        encode({"alg": "none", "typ": "JWT"}),
+        encode({"sub": "fake", "exp": int(time.time()) + lifetime}),
+        "",
+    ])
+
+
+def _fixture_name(request: web.Request, body: bytes) -> str:
+    """Name a fixture after the request, bodies of POST requests are part of the key."""
+    key = f"{request.method} {request.path_qs}".encode() + b"\n" + body
+    slug = request.path.strip("/").replace("/", "_")
+
+    return f"{request.method.lower()}_{slug}_{hashlib.sha1(key).hexdigest()[:12]}.json"
+
+
+class FakeServer:
+    """aiohttp application serving the endpoints the integration uses."""
+
+    def __init__(self, options: FakeServerOptions) -> None:
+        self.options = options
+        self.stats = FakeServerStats()
+        self._rng = random.Random(options.seed)
+        self._session: ClientSession | None = None
+
+    def app(self) -> web.Application:
+        app = web.Application(middlewares=[self._faults])
+        app.router.add_get("/_stats", self._stats)
+
+        if self.options.record or self.options.replay:
+            app.router.add_route("*", "/{path:.*}", self._fixture)
+            app.on_cleanup.append(self._close)
+            return app
+
+        app.router.add_post("/connect/token", self._token)
+        app.router.add_get("/connect/userinfo", self._userinfo)
+        app.router.add_post("/energy/v1/customer/productPicker", self._product_picker)
+        app.router.add_get("/energy/v1/contract/{contract_id}/dashboard/hourlytariff", self._hourly_tariff)
+
+        return app
+
+    @web.middleware
+    async def _faults(self, request: web.Request, handler) -> web.StreamResponse:
+        if request.path == "/_stats":
+            return await handler(request)
+
+        self.stats.requests[request.path] += 1
+        options = self.options
+
+        delay = options.latency + self._rng.uniform(0, options.latency_jitter)
+        if delay:
+            await asyncio.sleep(delay)
+
+        if self._rng.random() < options.rate_limit_rate:
+            self.stats.rate_limited += 1
+            return web.json_response(
+                {"error": "too_many_requests"}, status=429, headers={"Retry-After": str(options.retry_after)}
+            )
+
+        if self._rng.random() < options.error_rate:
+            self.stats.errors += 1
+            return web.json_response({"error": "internal_error"}, status=500)
+
+        response = await handler(request)
+        if isinstance(response, web.Response) and response.body is not None:
+            self.stats.bytes_sent += len(response.body)
+
+        return response
+
+    def _json(self, request: web.Request, payload: dict) -> web.Response:
+        """Serve a payload with an ETag, answering a GET with 304 when the client already has it."""
+        body = json.dumps(payload).encode()
+        etag = '"' + hashlib.blake2b(body, digest_size=8).hexdigest() + '"'
+
+        if request.method == "GET" and request.headers.get("If-None-Match") == etag:
+            self.stats.not_modified += 1
+            return web.Response(status=304, headers={"ETag": etag})
+
+        return web.Response(body=body, content_type="application/json", headers={"ETag": etag})
+
+    async def _stats(self, request: web.Request) -> web.Response:
+        return web.json_response(self.stats.as_dict())
+
+    async def _token(self, request: web.Request) -> web.Response:
+        return web.json_response({
+            "access_token": fake_jwt(self.options.token_lifetime),
+            "refresh_token": "fake-refresh-token",
+            "expires_in": self.options.token_lifetime,
+            "token_type": "Bearer",
+        })
+
+    async def _userinfo(self, request: web.Request) -> web.Response:
+        return self._json(request, {"sub": "fake", "email": "fake@example.com", "name": "Stand-in"})
+
+    async def _product_picker(self, request: web.Request) -> web.Response:
+        return self._json(request, product_picker_payload(self.options.contracts, self.options.seed))
+
+    async def _hourly_tariff(self, request: web.Request) -> web.Response:
+        contract_id = int(request.match_info["contract_id"])
+        seed = self.options.seed + contract_id
+
+        if "periodFrom" in request.query and "periodTo" in request.query:
+            period_from = datetime.fromisoformat(request.query["periodFrom"]).astimezone(TIME_ZONE)
+            period_to = datetime.fromisoformat(request.query["periodTo"]).astimezone(TIME_ZONE)
+            # Timestamps, subtracting times in the same zone would give the wall-clock difference.
+            hours = int(period_to.timestamp() - period_from.timestamp()) // 3600
+            # A spare day, local days around a DST change are an hour short.
+            payload = hourly_tariff_payload(hours // 24 + 1, period_from, seed)
+            del payload["electricityTariffs"][hours:]
+        else:
+            payload = hourly_tariff_payload(self.options.days, seed=seed)
+
+        return self._json(request, payload)
+
+    def _upstream(self, request: web.Request) -> str:
+        if request.path.startswith("/connect/"):
+            return self.options.accounts_upstream
+
+        return self.options.api_upstream
+
+    async def _fixture(self, request: web.Request) -> web.Response:
+        """Proxy to the real APIs and store the response, or replay a stored one."""
+        body = await request.read()
+        name = _fixture_name(request, body)
+
+        if self.options.replay:
+            path = self.options.replay / name
+            if not path.exists():
+                return web.json_response({"error": f"no fixture {name}"}, status=404)
+
+            fixture = json.loads(path.read_text())
+            return web.Response(
+                status=fixture["status"], text=fixture["body"], content_type=fixture["content_type"]
+            )
+
+        if self._session is None:
+            self._session = ClientSession(auto_decompress=True)
+
+        headers = {key: value for key, value in request.headers.items() if key.lower() not in HOP_HEADERS}
+        async with self._session.request(
+                request.method, self._upstream(request) + request.path_qs, headers=headers, data=body
+        ) as upstream:
+            text = await upstream.text()
+            content_type = upstream.content_type
+            status = upstream.status
+
+        self.options.record.mkdir(parents=True, exist_ok=True)
+        (self.options.record / name).write_text(json.dumps({
+            "request": f"{request.method} {request.path_qs}",
+            "status": status,
+            "content_type": content_type,
+            "body": text,
+        }, indent=2))
+
+        return web.Response(status=status, text=text, content_type=content_type)
+
+    async def _close(self, app: web.Application) -> None:
+        if self._session is not None:
+            await self._session.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--contracts", type=int, default=1, help="dynamic contracts in productPicker")
+    parser.add_argument("--days", type=int, default=2, help="days of tariffs per hourlytariff response")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--latency-jitter", type=float, default=0.0, help="random extra latency in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="fraction of requests answered 429")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After of 429 responses in seconds")
+    parser.add_argument("--token-lifetime", type=int, default=TOKEN_LIFETIME)
+    parser.add_argument("--seed", type=int, default=0)
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--record", type=Path, help="proxy to the real APIs and store fixtures in this directory")
+    mode.add_argument("--replay", type=Path, help="serve the fixtures stored in this directory")
+    parser.add_argument("--accounts-upstream", default=ACCOUNTS_URL)
+    parser.add_argument("--api-upstream", default=API_URL)
+    arguments = parser.parse_args()
+
+    options = FakeServerOptions(
+        **{name: value for name, value in vars(arguments).items() if name not in ("host", "port")}
+    )
+    web.run_app(FakeServer(options).app(), host=arguments.host, port=arguments.port)
+
+
+if __name__ == "__main__":
+    main()
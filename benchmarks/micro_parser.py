@@ -0,0 +1,72 @@
+"""Compare the single-pass tariff parser with the original dataclass parser.
+
+Run from the repository root:
+
+    python benchmarks/micro_parser.py [days]
+"""
+import json
+import sys
+import timeit
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from custom_components.budgetthuis.parser import loads, parse_hourly_tariff  # noqa: E402
+from custom_components.budgetthuis.structs.hourly_tariff import AmountDetails, HourlyTariff  # noqa: E402
+from payloads import hourly_tariff_payload  # noqa: E402
+
+
+def original_parse(body: bytes) -> list[HourlyTariff]:
+    """The parser as it was before the parser module: stdlib json and nested lookups."""
+    tariffs = []
+
+    for tariff in json.loads(body)['electricityTariffs']:
+        tariffs.append(
+            HourlyTariff(
+                total=AmountDetails(
+                    net=tariff['totalTariff']['amountNet'],
+                    vat=tariff['totalTariff']['amountVat'],
+                    gross=tariff['totalTariff']['amountGross']
+                ),
+                tax=AmountDetails(
+                    net=tariff['energyTax']['amountNet'],
+                    vat=tariff['energyTax']['amountVat'],
+                    gross=tariff['energyTax']['amountGross']
+                ),
+                surcharge=AmountDetails(
+                    net=tariff['surcharge']['amountNet'],
+                    vat=tariff['surcharge']['amountVat'],
+                    gross=tariff['surcharge']['amountGross']
+                ),
+                commodity=AmountDetails(
+                    net=tariff['commodity']['amountNet'],
+                    vat=tariff['commodity']['amountVat'],
+                    gross=tariff['commodity']['amountGross']
+                ),
+                periodFrom=datetime.fromisoformat(tariff['periodFrom']),
+                periodTo=datetime.fromisoformat(tariff['periodTo'])
+            )
+        )
+
+    return tariffs
+
+
+def main() -> None:
+    days = int(sys.argv[1]) if len(sys.argv) > 1 else 7
+    payload = hourly_tariff_payload(days)
+    body = json.dumps(payload).encode()
+    number = max(10, 2000 // days)
+
+    original = min(timeit.repeat(lambda: original_parse(body), number=number, repeat=5)) / number
+    single_pass = min(timeit.repeat(lambda: parse_hourly_tariff(loads(body)), number=number, repeat=5)) / number
+
+    print(f"payload: {days} days, {len(payload['electricityTariffs'])} tariffs, {len(body)} bytes, decoder: {loads.__module__}")
+    print(f"original parser:    {original * 1e6:9.1f} us")
+    print(f"single-pass parser: {single_pass * 1e6:9.1f} us")
+    print(f"speedup:            {original / single_pass:9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
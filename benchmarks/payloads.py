@@ -0,0 +1,63 @@
+"""Realistic Nutsservices payloads for benchmarks and the stand-in server."""
+import random
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+TIME_ZONE = ZoneInfo("Europe/Amsterdam")
+
+
+def _amount(rng: random.Random, net: float) -> dict:
+    vat = round(net * 0.21, 5)
+    return {"amountNet": round(net, 5), "amountVat": vat, "amountGross": round(net + vat, 5)}
+
+
+def hourly_tariff_payload(days: int = 2, start: datetime | None = None, seed: int = 0) -> dict:
+    """Return an hourlytariff response covering the given number of days."""
+    rng = random.Random(seed)
+    start = start or datetime.now(TIME_ZONE).replace(hour=0, minute=0, second=0, microsecond=0)
+    tariffs = []
+
+    # Local days around a DST change are 23 or 25 hours long, so hours are stepped in UTC.
+    first = start.astimezone(timezone.utc)
+    end = (start.astimezone(TIME_ZONE) + timedelta(days=days)).astimezone(timezone.utc)
+
+    for hour in range(int((end - first).total_seconds()) // 3600):
+        period_from = first + timedelta(hours=hour)
+        commodity = rng.uniform(-0.05, 0.35)
+        tax = 0.1088
+        surcharge = 0.0165
+        tariffs.append({
+            "periodFrom": period_from.astimezone(TIME_ZONE).isoformat(),
+            "periodTo": (period_from + timedelta(hours=1)).astimezone(TIME_ZONE).isoformat(),
+            "totalTariff": _amount(rng, commodity + tax + surcharge),
+            "energyTax": _amount(rng, tax),
+            "surcharge": _amount(rng, surcharge),
+            "commodity": _amount(rng, commodity),
+        })
+
+    return {"electricityTariffs": tariffs}
+
+
+def product_picker_payload(contracts: int = 1, seed: int = 0) -> dict:
+    """Return a productPicker response with the given number of dynamic contracts."""
+    rng = random.Random(seed)
+
+    return {
+        "contractsInfo": [
+            {
+                "contractId": 1000000 + index,
+                "relationId": 2000000 + index,
+                "propositionType": "Electricity",
+                "contractStatus": "Active",
+                "contractType": "Dynamic",
+                "supplyAddress": {
+                    "zipCode": f"{rng.randint(1000, 9999)}AB",
+                    "houseNumber": rng.randint(1, 300),
+                    "houseNumberExtension": "",
+                    "city": "Utrecht",
+                    "street": "Stationsplein",
+                },
+            }
+            for index in range(contracts)
+        ]
+    }
@@ -1,21 +1,58 @@
+import asyncio
+import base64
+import json
 import logging
-import requests
 import time
-import urllib3
+import voluptuous as vol
 from aiohttp.client_exceptions import ClientError, ClientResponseError
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import CONF_ACCESS_TOKEN
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.exceptions import (ConfigEntryNotReady, HomeAssistantError)
 from homeassistant.helpers import config_entry_oauth2_flow
+from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.aiohttp_client import async_create_clientsession
 from homeassistant.helpers.config_entry_oauth2_flow import (
     OAuth2Session, async_get_config_entry_implementation)
+from homeassistant.helpers.typing import ConfigType
+from yarl import URL
 
 from .budget_thuis import BudgetThuis
-from .const import DOMAIN, PLATFORMS
+from .client import CircuitBreaker, ConnectionStats, EndpointStats, retry_budget
+from .const import (BUDGETTHUIS_ACCOUNTS_URL, CONF_ACCOUNTS_URL, CONF_API_URL, DOMAIN, NUTSSERVICES_API_URL,
+                    PLATFORMS, REFRESH_RETRY_BUDGET, REFRESH_STAGGER, USERINFO_TTL)
+from .coordinator import BudgetThuisCoordinator
+from .nutsservices import Nutsservices
+from .services import async_setup_services
+from .store import BudgetThuisStore
 
 _LOGGER = logging.getLogger(__name__)
 
+# Request paths are appended to the base URLs, so a trailing slash is dropped.
+BASE_URLS_SCHEMA = vol.Schema(
+    {
+        vol.Optional(CONF_ACCOUNTS_URL, default=BUDGETTHUIS_ACCOUNTS_URL): vol.All(
+            cv.url, cv.url_no_path, lambda url: url.rstrip("/")
+        ),
+        vol.Optional(CONF_API_URL, default=NUTSSERVICES_API_URL): vol.All(
+            cv.url, cv.url_no_path, lambda url: url.rstrip("/")
+        ),
+    }
+)
+
+# Entries are set up through the UI, the YAML block only exists to point the
+# integration at a stand-in server for offline testing.
+CONFIG_SCHEMA = vol.Schema({vol.Optional(DOMAIN): BASE_URLS_SCHEMA}, extra=vol.ALLOW_EXTRA)
+
+
+async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
+    """Set up the Budget Thuis services."""
+    hass.data.setdefault(DOMAIN, {})['base_urls'] = config.get(DOMAIN) or BASE_URLS_SCHEMA({})
+    await async_setup_services(hass)
+
+    return True
+
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> True:
     """Set up Budget Thuis from config entry."""
@@ -23,59 +60,157 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> True:
 
     hass.data.setdefault(DOMAIN, {})
 
+    await er.async_migrate_entries(hass, entry.entry_id, _migrate_unique_id)
+
     implementation = await async_get_config_entry_implementation(hass, entry)
     session = OAuth2Session(hass, entry, implementation)
-    auth = AsyncConfigEntryAuth(session)
 
-    try:
-        await auth.check_and_refresh_token()
-    except requests.exceptions.ConnectionError as exception:
-        raise ConfigEntryNotReady("Unable to retrieve oauth data from Budget Thuis.") from exception
+    # One client session per config entry, kept for the lifetime of the entry, so
+    # connections are reused between refreshes and only the bearer token changes.
+    # Home Assistant detaches it when the entry is unloaded.
+    connection_stats = ConnectionStats()
+    client_session = async_create_clientsession(hass, trace_configs=[connection_stats.trace_config()])
+    base_urls = hass.data[DOMAIN].get('base_urls') or BASE_URLS_SCHEMA({})
+    budget_thuis = BudgetThuis(
+        client_session,
+        session.token[CONF_ACCESS_TOKEN],
+        base_urls[CONF_ACCOUNTS_URL],
+        _circuit_breaker(hass, base_urls[CONF_ACCOUNTS_URL])
+    )
+    nutsservices = Nutsservices(
+        client_session,
+        session.token[CONF_ACCESS_TOKEN],
+        base_urls[CONF_API_URL],
+        _circuit_breaker(hass, base_urls[CONF_API_URL])
+    )
+
+    auth = AsyncConfigEntryAuth(session, budget_thuis, nutsservices)
+    budget_thuis.token_refresher = auth.async_force_refresh
+    nutsservices.token_refresher = auth.async_force_refresh
+
+    store = BudgetThuisStore(hass, entry.entry_id)
+    coordinator = BudgetThuisCoordinator(hass, store)
 
     hass.data[DOMAIN][entry.entry_id] = {
-        'auth': auth
+        'auth': auth,
+        'budget_thuis': budget_thuis,
+        'nutsservices': nutsservices,
+        'connection_stats': connection_stats,
+        'coordinator': coordinator,
     }
 
-    _LOGGER.debug('Using access token: %s', auth.access_token)
+    snapshot = await store.async_load()
 
-    api = BudgetThuis(auth.access_token)
+    # Every entry refreshes at its own offset within the hour.
+    stagger = REFRESH_STAGGER * [item.entry_id for item in hass.config_entries.async_entries(DOMAIN)].index(
+        entry.entry_id
+    )
 
-    try:
-        userinfo = await hass.async_add_executor_job(api.get_user_info)
-        _LOGGER.debug(userinfo)
-    except (requests.exceptions.RequestException, urllib3.exceptions.MaxRetryError) as exception:
-        raise ConfigEntryNotReady("Unable to retrieve user information from Budget Thuis.") from exception
+    if snapshot is None:
+        # Without a snapshot there is nothing to show yet, so the first fetch waits for its offset.
+        await asyncio.sleep(stagger.total_seconds())
 
-    if "error" in userinfo:
-        raise ConfigEntryNotReady("Error in retrieving user information from Budget Thuis.")
-
-    hass.data[DOMAIN][entry.entry_id]['userinfo'] = userinfo
+        try:
+            await _async_refresh_userinfo(hass, entry)
+            await coordinator.async_config_entry_first_refresh()
+        except ConfigEntryNotReady:
+            await _async_close_entry_data(hass.data[DOMAIN].pop(entry.entry_id))
+            raise
+    else:
+        # Bring the sensors up from the last snapshot and talk to the API in the background.
+        _LOGGER.debug("Restoring %d contracts from storage", len(snapshot['contracts']))
+        auth.userinfo = snapshot['userinfo']
+        auth.userinfo_fetched_at = snapshot['userinfo_fetched_at']
+        hass.data[DOMAIN][entry.entry_id]['userinfo'] = auth.userinfo
+        coordinator.restore(snapshot)
+        coordinator.async_schedule_staggered_refresh(stagger)
 
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
 
     return True
 
 
+@callback
+def _migrate_unique_id(entity_entry: er.RegistryEntry) -> dict[str, str] | None:
+    """Key the entities on the config entry id, the entries have no unique id of their own."""
+    prefix, _, key = entity_entry.unique_id.partition(".")
+    if prefix != "None":
+        return None
+
+    return {"new_unique_id": f"{entity_entry.config_entry_id}.{key}"}
+
+
+def _circuit_breaker(hass: HomeAssistant, base_url: str) -> CircuitBreaker:
+    """Return the circuit breaker of a host, shared by all config entries."""
+    breakers: dict[str, CircuitBreaker] = hass.data[DOMAIN].setdefault('circuit_breakers', {})
+
+    return breakers.setdefault(URL(base_url).host, CircuitBreaker())
+
+
+async def _async_refresh_userinfo(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Validate the token and fetch the user information of a config entry."""
+    entry_data = hass.data[DOMAIN][entry.entry_id]
+    auth: AsyncConfigEntryAuth = entry_data['auth']
+
+    # Setup is retried by Home Assistant, so it shouldn't wait on a slow API for long.
+    with retry_budget(REFRESH_RETRY_BUDGET.total_seconds()):
+        try:
+            await auth.check_and_refresh_token()
+        except HomeAssistantError as exception:
+            raise ConfigEntryNotReady("Unable to retrieve oauth data from Budget Thuis.") from exception
+
+        _LOGGER.debug('Using access token: %s', auth.access_token)
+
+        try:
+            userinfo = await auth.async_get_user_info()
+            _LOGGER.debug(userinfo)
+        except (ClientError, asyncio.TimeoutError) as exception:
+            raise ConfigEntryNotReady("Unable to retrieve user information from Budget Thuis.") from exception
+
+    if "error" in userinfo:
+        raise ConfigEntryNotReady("Error in retrieving user information from Budget Thuis.")
+
+    entry_data['userinfo'] = userinfo
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload Budget Thuis config entry."""
     _LOGGER.debug('Reloading Budget Thuis integration')
     unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
 
     if unload_ok:
-        hass.data[DOMAIN].pop(entry.entry_id)
+        await _async_close_entry_data(hass.data[DOMAIN].pop(entry.entry_id))
 
     return unload_ok
 
 
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Remove the stored snapshot of a deleted config entry."""
+    await BudgetThuisStore(hass, entry.entry_id).async_remove()
+
+
+async def _async_close_entry_data(entry_data: dict) -> None:
+    """Release the resources held for a config entry."""
+    await entry_data['coordinator'].async_shutdown()
+
+
 class AsyncConfigEntryAuth:
     """Provide Budget Thuis authentication tied to an OAuth2 based config entry."""
 
     def __init__(
             self,
             oauth2_session: config_entry_oauth2_flow.OAuth2Session,
+            budget_thuis: BudgetThuis,
+            nutsservices: Nutsservices,
     ) -> None:
         """Initialize Budget Thuis Auth."""
         self.oauth_session = oauth2_session
+        self.budget_thuis = budget_thuis
+        self.nutsservices = nutsservices
+        self.userinfo: dict | None = None
+        self.userinfo_fetched_at: float = 0
+        self.token_stats = EndpointStats()
+        self._refresh_lock = asyncio.Lock()
 
     @property
     def access_token(self) -> str:
@@ -86,21 +221,68 @@ class AsyncConfigEntryAuth:
         _LOGGER.debug('Force token refresh')
         self.oauth_session.token["expires_at"] = time.time() - 600
 
+    async def async_force_refresh(self, rejected_token: str) -> str:
+        """Refresh a token which was rejected by the API, once for all concurrent callers."""
+        async with self._refresh_lock:
+            if self.access_token == rejected_token:
+                await self.force_refresh_expire()
+                await self.check_and_refresh_token()
+
+        return self.access_token
+
     async def check_and_refresh_token(self) -> str:
-        """Check the token."""
+        """Check the token.
+
+        Validity is decided locally from the stored expiry and the exp claim of the
+        JWT, so the API is only contacted when the token has to be refreshed.
+        """
+
+        jwt_expires_at = _jwt_expires_at(self.access_token)
+        if jwt_expires_at is not None and jwt_expires_at < self.oauth_session.token["expires_at"]:
+            self.oauth_session.token["expires_at"] = jwt_expires_at
+
+        refreshing = not self.oauth_session.valid_token
+        started = time.monotonic()
 
         try:
             await self.oauth_session.async_ensure_token_valid()
-            api = BudgetThuis(self.access_token)
-            await self.oauth_session.hass.async_add_executor_job(api.get_user_info)
 
-        except (ClientResponseError, ClientError) as exception:
+            # Swap the token on the long-lived clients instead of building new ones.
+            self.budget_thuis.set_access_token(self.access_token)
+            self.nutsservices.set_access_token(self.access_token)
+
+        except (ClientResponseError, ClientError, asyncio.TimeoutError) as exception:
             _LOGGER.debug("API error: %s", exception)
-            if exception.status == 400:
+            self.token_stats.errors += 1
+            self.token_stats.last_error = str(exception) or type(exception).__name__
+            if isinstance(exception, ClientResponseError) and exception.status == 400:
                 self.oauth_session.config_entry.async_start_reauth(
                     self.oauth_session.hass
                 )
 
             raise HomeAssistantError(exception) from exception
+        finally:
+            # Only actual refreshes are recorded, the local validity check costs nothing.
+            if refreshing:
+                self.token_stats.requests += 1
+                self.token_stats.latency.record(time.monotonic() - started)
 
         return self.access_token
+
+    async def async_get_user_info(self) -> dict:
+        """Return the user information, only fetching it when the cached copy expired."""
+        if self.userinfo is None or time.time() - self.userinfo_fetched_at >= USERINFO_TTL.total_seconds():
+            self.userinfo = await self.budget_thuis.get_user_info()
+            self.userinfo_fetched_at = time.time()
+
+        return self.userinfo
+
+
+def _jwt_expires_at(token: str) -> float | None:
+    """Return the exp claim of a JWT access token, without verifying it."""
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        return float(json.loads(base64.urlsafe_b64decode(payload))["exp"])
+    except (IndexError, KeyError, TypeError, ValueError):
+        return None
@@ -0,0 +1,136 @@
+"""Price statistics over the cached tariff horizon, shared by the derived sensors."""
+from array import array
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta
+from homeassistant.util import dt as dt_util
+from itertools import repeat
+from math import fsum
+
+from .const import (PRICE_AVERAGE_DAYS, PRICE_CHEAP_PERCENTILE, PRICE_EXPENSIVE_PERCENTILE, PRICE_LEVEL_CHEAP,
+                    PRICE_LEVEL_EXPENSIVE, PRICE_LEVEL_NORMAL, TARIFF_TIME_ZONE)
+from .structs.tariff_timeline import TariffTimeline, to_epoch
+
+
+@dataclass
+class DayStatistics:
+    periods: int
+    min: float
+    max: float
+    mean: float
+    # Mean price of the days before, None without any history.
+    average: float | None
+
+
+@dataclass
+class PriceAnalytics:
+    price: float
+    rank: int
+    day: DayStatistics
+
+    @property
+    def percentile(self) -> float:
+        """Return where the price falls within its day, 0 is the cheapest and 100 the most expensive."""
+        if self.day.periods < 2:
+            return 0.0
+
+        return (self.rank - 1) / (self.day.periods - 1) * 100
+
+    @property
+    def deviation(self) -> float | None:
+        """Return the difference with the average price of the days before."""
+        return self.price - self.day.average if self.day.average is not None else None
+
+    @property
+    def level(self) -> str:
+        if self.percentile <= PRICE_CHEAP_PERCENTILE:
+            return PRICE_LEVEL_CHEAP
+
+        if self.percentile >= PRICE_EXPENSIVE_PERCENTILE:
+            return PRICE_LEVEL_EXPENSIVE
+
+        return PRICE_LEVEL_NORMAL
+
+
+class PriceAnalyzer:
+    """Keep the statistics of every period from today on until new tariffs arrive.
+
+    Each local day is sorted once and the rank of every period is found by
+    bisecting the sorted prices, so the statistics of the whole horizon cost
+    O(n log n) per fetch and a lookup at a tariff boundary is a single bisect.
+    """
+
+    def __init__(self, column: str = "total_gross") -> None:
+        self.column = column
+        self._timeline: TariffTimeline | None = None
+        self._first = 0
+        self._stop = 0
+        self._ranks = array('I')
+        self._day_of = array('I')
+        self._days: list[DayStatistics] = []
+
+    def update(self, timeline: TariffTimeline, now: datetime) -> None:
+        """Recompute when the timeline changed or the current period was not analysed."""
+        index = timeline.index_at(now)
+        if timeline is self._timeline and index is not None and self._first <= index < self._stop:
+            return
+
+        self._timeline = timeline
+        self._ranks = array('I')
+        self._day_of = array('I')
+        self._days = []
+
+        time_zone = dt_util.get_time_zone(TARIFF_TIME_ZONE)
+        day_start = datetime.combine(now.astimezone(time_zone).date(), time(), time_zone)
+        starts = timeline.starts
+        values = timeline.columns[self.column]
+
+        self._first = position = bisect_right(timeline.ends, to_epoch(day_start))
+        self._stop = len(timeline)
+
+        while position < self._stop:
+            # Local midnight, so days around a DST change are 23 or 25 hours long.
+            day_end = datetime.combine(day_start.date() + timedelta(days=1), time(), time_zone)
+            stop = bisect_left(starts, to_epoch(day_end), position, self._stop)
+
+            if stop > position:
+                prices = values[position:stop]
+                ordered = sorted(prices)
+                history = timeline.index_range(day_start - timedelta(days=PRICE_AVERAGE_DAYS), day_start)
+
+                self._ranks.extend(bisect_left(ordered, price) + 1 for price in prices)
+                self._day_of.extend(repeat(len(self._days), len(ordered)))
+                self._days.append(DayStatistics(
+                    periods=len(ordered),
+                    min=ordered[0],
+                    max=ordered[-1],
+                    mean=fsum(ordered) / len(ordered),
+                    average=fsum(values[history.start:history.stop]) / len(history) if history else None
+                ))
+
+            position = stop
+            day_start = day_end
+
+    def rank(self, index: int) -> int | None:
+        """Return the rank within its day of a period of the analysed timeline, 1 is the cheapest."""
+        if not self._first <= index < self._stop:
+            return None
+
+        return self._ranks[index - self._first]
+
+    def at(self, now: datetime) -> PriceAnalytics | None:
+        """Return the statistics of the period which applies at the given moment."""
+        if self._timeline is None:
+            return None
+
+        index = self._timeline.index_at(now)
+        if index is None or not self._first <= index < self._stop:
+            return None
+
+        offset = index - self._first
+
+        return PriceAnalytics(
+            price=self._timeline.columns[self.column][index],
+            rank=self._ranks[offset],
+            day=self._days[self._day_of[offset]]
+        )
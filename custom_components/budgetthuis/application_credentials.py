@@ -9,8 +9,9 @@ from homeassistant.core import HomeAssistant
 from homeassistant.helpers import config_entry_oauth2_flow
 from typing import Any
 
-from .const import (BUDGETTHUIS_AUTH_URL, BUDGETTHUIS_CLIENT_ID, BUDGETTHUIS_REDIRECT_URI,
-                    BUDGETTHUIS_SCOPE, BUDGETTHUIS_TOKEN_URL)
+from .const import (BUDGETTHUIS_ACCOUNTS_URL, BUDGETTHUIS_AUTH_PATH, BUDGETTHUIS_CLIENT_ID,
+                    BUDGETTHUIS_REDIRECT_URI, BUDGETTHUIS_SCOPE, BUDGETTHUIS_TOKEN_PATH, CONF_ACCOUNTS_URL,
+                    DOMAIN)
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -66,6 +67,10 @@ async def async_get_auth_implementation(
     code_challenge = base64.urlsafe_b64encode(code_challenge).decode('utf-8')
     code_challenge = code_challenge.replace('=', '')
 
+    accounts_url = hass.data.get(DOMAIN, {}).get('base_urls', {}).get(CONF_ACCOUNTS_URL, BUDGETTHUIS_ACCOUNTS_URL)
+    # Paths are appended, so a trailing slash would double up.
+    accounts_url = accounts_url.rstrip("/")
+
     return OAuth2Impl(
         hass,
         auth_domain,
@@ -74,8 +79,8 @@ async def async_get_auth_implementation(
             client_secret=""
         ),
         AuthorizationServer(
-            authorize_url=BUDGETTHUIS_AUTH_URL,
-            token_url=BUDGETTHUIS_TOKEN_URL
+            authorize_url=accounts_url + BUDGETTHUIS_AUTH_PATH,
+            token_url=accounts_url + BUDGETTHUIS_TOKEN_PATH
         ),
         code_challenge=code_challenge,
         code_verifier=code_verifier
@@ -0,0 +1,129 @@
+"""Append-only archive of historical tariffs, read back through mmap."""
+import logging
+import mmap
+import os
+import struct
+import threading
+from datetime import datetime
+
+from .structs.tariff_timeline import COLUMNS, TariffTimeline
+
+_LOGGER = logging.getLogger(__name__)
+
+# One fixed-size record per period: start, end and all price columns.
+RECORD = struct.Struct("=qq" + "d" * len(COLUMNS))
+FIELDS = 2 + len(COLUMNS)
+
+
+class TariffArchive:
+    """Tariff records of a single contract, appended in period order.
+
+    All methods do blocking file I/O and have to run in an executor. Only
+    appends modify the file, under a lock; reads ignore an incomplete last
+    record, which may be a write in progress.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._mmap: mmap.mmap | None = None
+        self._lock = threading.Lock()
+
+    def _complete_size(self) -> int:
+        """Return the size covered by complete records."""
+        try:
+            size = os.path.getsize(self.path)
+        except FileNotFoundError:
+            return 0
+
+        return size - size % RECORD.size
+
+    def _repair(self) -> None:
+        """Drop a torn last write, only called with the lock held."""
+        try:
+            size = os.path.getsize(self.path)
+        except FileNotFoundError:
+            return
+
+        if size % RECORD.size:
+            _LOGGER.warning("Dropping incomplete record at the end of %s", self.path)
+            os.truncate(self.path, size - size % RECORD.size)
+
+    def last_end(self) -> int | None:
+        """Return the end epoch of the last archived period."""
+        size = self._complete_size()
+        if not size:
+            return None
+
+        with open(self.path, "rb") as file:
+            file.seek(size - RECORD.size)
+            return RECORD.unpack(file.read(RECORD.size))[1]
+
+    def append(self, timeline: TariffTimeline) -> int:
+        """Append the periods after the last archived one and return how many were written."""
+        with self._lock:
+            self._repair()
+
+            return self._append(timeline)
+
+    def _append(self, timeline: TariffTimeline) -> int:
+        last_end = self.last_end()
+        records = bytearray()
+
+        for index in range(len(timeline)):
+            if last_end is not None and timeline.starts[index] < last_end:
+                continue
+
+            records += RECORD.pack(
+                timeline.starts[index],
+                timeline.ends[index],
+                *(timeline.columns[column][index] for column in COLUMNS)
+            )
+            last_end = timeline.ends[index]
+
+        if records:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, "ab") as file:
+                file.write(records)
+
+            # Map the grown file on the next read; views on the old map keep it alive.
+            self._mmap = None
+
+        return len(records) // RECORD.size
+
+    def timeline(self) -> TariffTimeline:
+        """Return the archive as a timeline of strided views on the mapped file.
+
+        Nothing is parsed or copied, so range queries over years of history only
+        touch the pages they bisect into.
+        """
+        with self._lock:
+            if self._mmap is None:
+                size = self._complete_size()
+                if not size:
+                    return TariffTimeline.empty()
+
+                with open(self.path, "rb") as file:
+                    self._mmap = mmap.mmap(file.fileno(), size, access=mmap.ACCESS_READ)
+
+            raw = memoryview(self._mmap)
+
+        integers = raw.cast('q')
+        floats = raw.cast('d')
+
+        return TariffTimeline(
+            integers[0::FIELDS],
+            integers[1::FIELDS],
+            {column: floats[2 + offset::FIELDS] for offset, column in enumerate(COLUMNS)}
+        )
+
+    def with_history(self, timeline: TariffTimeline, start: datetime, end: datetime) -> TariffTimeline:
+        """Return the archived periods overlapping [start, end), followed by a newer timeline.
+
+        Only the requested range of the archive is copied, so the result stays
+        valid after the archive is remapped.
+        """
+        archived = self.timeline().between(start, end)
+        if not len(archived):
+            return timeline
+
+        return archived.merge(timeline)
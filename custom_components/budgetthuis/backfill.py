@@ -0,0 +1,73 @@
+"""Resumable backfill of historical tariffs into the local archive."""
+import asyncio
+import logging
+from datetime import datetime
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.util import utcnow
+
+from .archive import TariffArchive
+from .const import BACKFILL_CHUNK, BACKFILL_CHUNK_DELAY, DOMAIN
+from .nutsservices import Nutsservices
+from .structs.tariff_timeline import from_epoch
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def async_get_archive(hass: HomeAssistant, contract_id: int) -> TariffArchive:
+    """Return the shared archive of a contract."""
+    archives: dict[int, TariffArchive] = hass.data[DOMAIN].setdefault('archives', {})
+
+    if contract_id not in archives:
+        archives[contract_id] = TariffArchive(hass.config.path(DOMAIN, f"tariffs_{contract_id}.bin"))
+
+    return archives[contract_id]
+
+
+async def async_backfill_tariffs(
+        hass: HomeAssistant,
+        nutsservices: Nutsservices,
+        archive: TariffArchive,
+        contract_id: int,
+        start: datetime
+) -> int:
+    """Archive the tariffs of a contract from start up to now.
+
+    Resumes after the last archived period, requests one chunk at a time and
+    pauses between chunks, so the live refresh keeps priority on the API.
+    """
+    last_end = await hass.async_add_executor_job(archive.last_end)
+    period_from = max(start, from_epoch(last_end)) if last_end is not None else start
+    period_to = utcnow().replace(minute=0, second=0, microsecond=0)
+    archived = 0
+
+    _LOGGER.debug("Backfilling tariffs of contract %d from %s to %s", contract_id, period_from, period_to)
+
+    async for chunk in nutsservices.iter_hourly_tariffs(contract_id, period_from, period_to, BACKFILL_CHUNK):
+        archived += await hass.async_add_executor_job(archive.append, chunk)
+        await asyncio.sleep(BACKFILL_CHUNK_DELAY.total_seconds())
+
+    _LOGGER.debug("Archived %d tariff periods of contract %d", archived, contract_id)
+
+    return archived
+
+
+@callback
+def async_start_backfill(hass: HomeAssistant, entry: ConfigEntry, contract_id: int, start: datetime) -> bool:
+    """Start a backfill in the background, unless one is already running for the contract."""
+    entry_data = hass.data[DOMAIN][entry.entry_id]
+    # Per contract like the archive, so entries sharing a contract never append at the same time.
+    backfills: dict[int, asyncio.Task] = hass.data[DOMAIN].setdefault('backfills', {})
+
+    if contract_id in backfills and not backfills[contract_id].done():
+        return False
+
+    backfills[contract_id] = entry.async_create_background_task(
+        hass,
+        async_backfill_tariffs(
+            hass, entry_data['nutsservices'], async_get_archive(hass, contract_id), contract_id, start
+        ),
+        f"{DOMAIN} backfill {contract_id}"
+    )
+
+    return True
@@ -0,0 +1,176 @@
+"""Binary sensor for Budget Thuis packages."""
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from homeassistant.components.binary_sensor import BinarySensorEntity, BinarySensorEntityDescription
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HassJob, HomeAssistant, callback
+from homeassistant.helpers.event import async_track_point_in_utc_time
+from homeassistant.util import utcnow
+from typing import Any, Callable
+
+from . import DOMAIN
+from .const import (CONF_CHEAPEST_HOURS_PER_DAY, CONF_PRICE_THRESHOLD, DEFAULT_CHEAPEST_HOURS_PER_DAY,
+                    DEFAULT_PRICE_THRESHOLD)
+from .coordinator import BudgetThuisCoordinator
+from .entity import BudgetThuisContractEntity, async_add_contract_entities
+from .schedule import Schedule
+from .structs.contract import Contract
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclass
+class BudgetThuisBinarySensorEntityDescription(BinarySensorEntityDescription):
+    """Describes Budget Thuis binary sensor entity."""
+
+    option: str | None = None
+    default: Any = None
+    schedule_fn: Callable[[dict, Any, datetime], Schedule] = None
+
+
+def _below_threshold(data: dict, threshold: float, now: datetime) -> Schedule:
+    prices = data['timeline'].columns["total_gross"]
+
+    return Schedule.from_timeline(data['timeline'], now, lambda index: prices[index] < threshold)
+
+
+def _in_cheapest_hours(data: dict, hours: int, now: datetime) -> Schedule:
+    timeline = data['timeline']
+    analyzer = data['analyzer']
+
+    def is_on(index: int) -> bool:
+        rank = analyzer.rank(index)
+        # Periods shorter than an hour count for part of an hour.
+        return rank is not None and rank <= hours * 3600 / (timeline.ends[index] - timeline.starts[index])
+
+    return Schedule.from_timeline(timeline, now, is_on)
+
+
+BINARY_SENSOR_TYPES: tuple[BudgetThuisBinarySensorEntityDescription, ...] = (
+    BudgetThuisBinarySensorEntityDescription(
+        key="price_below_threshold",
+        name="Price below threshold",
+        icon="mdi:cash-check",
+        option=CONF_PRICE_THRESHOLD,
+        default=DEFAULT_PRICE_THRESHOLD,
+        schedule_fn=_below_threshold,
+    ),
+    BudgetThuisBinarySensorEntityDescription(
+        key="in_cheapest_hours",
+        name="In cheapest hours of the day",
+        icon="mdi:clock-check-outline",
+        option=CONF_CHEAPEST_HOURS_PER_DAY,
+        default=DEFAULT_CHEAPEST_HOURS_PER_DAY,
+        schedule_fn=_in_cheapest_hours,
+    ),
+)
+
+
+async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry, async_add_entities):
+    """Set up the Budget Thuis binary sensor platform."""
+
+    coordinator: BudgetThuisCoordinator = hass.data[DOMAIN][entry.entry_id]['coordinator']
+
+    async_add_contract_entities(coordinator, entry, async_add_entities, lambda contract: [
+        BudgetThuisBinarySensor(coordinator, description, entry, contract) for description in BINARY_SENSOR_TYPES
+    ])
+
+
+class BudgetThuisBinarySensor(BudgetThuisContractEntity, BinarySensorEntity):
+    """Representation of a Budget Thuis binary sensor.
+
+    The moments the sensor flips are computed once when new tariffs arrive,
+    after that a single timer for the next flip drives the state.
+    """
+
+    _attr_attribution = "Data provided by Budget Thuis"
+
+    def __init__(
+            self,
+            coordinator: BudgetThuisCoordinator,
+            description: BudgetThuisBinarySensorEntityDescription,
+            entry: ConfigEntry,
+            contract: Contract,
+    ) -> None:
+        """Initialize the binary sensor."""
+        self.entity_description: BudgetThuisBinarySensorEntityDescription = description
+        super().__init__(coordinator, description, entry, contract)
+
+        self._schedule: Schedule | None = None
+        self._schedule_key: tuple | None = None
+        self._change_job = HassJob(self._handle_change, cancel_on_shutdown=True)
+        self._unsub_change = None
+        self._change_at: datetime | None = None
+        self._now = utcnow()
+
+        self._update_state()
+
+    @property
+    def available(self) -> bool:
+        """Return if the tariffs of the contract are known."""
+        return super().available and self._schedule is not None and self._attr_is_on is not None
+
+    async def async_added_to_hass(self) -> None:
+        """Arm the timer for the next flip."""
+        await super().async_added_to_hass()
+        self.async_on_remove(self._async_cancel_change)
+        self._async_schedule_change()
+
+    def _update_state(self) -> None:
+        data = self.contract
+        description = self.entity_description
+        option = self.coordinator.config_entry.options.get(description.option, description.default)
+
+        if data is None or not len(data['timeline']):
+            self._schedule = self._schedule_key = None
+        elif self._schedule_key != (data['timeline'], option):
+            # New tariffs or a changed option, the only moments the flips are computed.
+            self._schedule = description.schedule_fn(data, option, self._now)
+            self._schedule_key = (data['timeline'], option)
+
+        self._attr_is_on = self._schedule.state_at(self._now) if self._schedule else None
+
+        next_change = self._schedule.next_change(self._now) if self._schedule else None
+        self._attr_extra_state_attributes = {
+            description.option: option,
+            "next_change": next_change.isoformat() if next_change else None,
+        }
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Handle updated data, only a new schedule can move the next flip."""
+        self._now = utcnow()
+        super()._handle_coordinator_update()
+        self._async_schedule_change()
+
+    @callback
+    def _async_cancel_change(self) -> None:
+        if self._unsub_change:
+            self._unsub_change()
+            self._unsub_change = None
+            self._change_at = None
+
+    @callback
+    def _async_schedule_change(self) -> None:
+        """Arm a single timer for the next flip, unless it is already armed for it."""
+        change_at = self._schedule.next_change(self._now) if self._schedule else None
+        if change_at == self._change_at:
+            return
+
+        self._async_cancel_change()
+        if change_at is None:
+            return
+
+        self._change_at = change_at
+        self._unsub_change = async_track_point_in_utc_time(self.hass, self._change_job, change_at)
+
+    @callback
+    def _handle_change(self, point_in_time: datetime) -> None:
+        """Flip at the exact moment the schedule changes."""
+        self._unsub_change = None
+        self._change_at = None
+        self._now = max(point_in_time, utcnow())
+
+        super()._handle_coordinator_update()
+        self._async_schedule_change()
@@ -0,0 +1,455 @@
+import asyncio
+import hashlib
+import logging
+import random
+import time
+from bisect import bisect_left
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable
+
+from aiohttp import (ClientConnectionError, ClientError, ClientResponseError, ClientSession, ClientTimeout,
+                     TraceConfig, hdrs)
+
+from .parser import loads
+
+_LOGGER = logging.getLogger(__name__)
+
+REQUEST_TIMEOUT = ClientTimeout(total=30)
+RETRY_TOTAL = 5
+RETRY_BACKOFF_FACTOR = 3
+RETRY_BACKOFF_MAX = 60
+# Backoffs are drawn between this fraction and the full exponential backoff.
+RETRY_JITTER = 0.5
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+CIRCUIT_FAILURE_THRESHOLD = 5
+CIRCUIT_RESET_TIMEOUT = 300
+
+# Monotonic deadline after which failed requests are no longer retried, see retry_budget.
+_retry_deadline: ContextVar[float | None] = ContextVar("retry_deadline", default=None)
+
+# Upper bounds in seconds of the latency histogram buckets, the last bucket is unbounded.
+LATENCY_BUCKETS: tuple[float, ...] = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+# aiohttp only decodes brotli bodies when one of these packages is installed.
+try:
+    import brotli  # noqa: F401
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        ACCEPT_ENCODING = "gzip, deflate, br"
+    except ImportError:
+        ACCEPT_ENCODING = "gzip, deflate"
+
+
+class CircuitOpenError(ClientError):
+    """Raised without contacting a host whose circuit breaker is open."""
+
+
+@contextmanager
+def retry_budget(seconds: float) -> Iterator[None]:
+    """Limit the total time requests in this context may spend on retries.
+
+    Tasks created inside the context, like those of asyncio.gather, share the budget.
+    """
+    token = _retry_deadline.set(time.monotonic() + seconds)
+    try:
+        yield
+    finally:
+        _retry_deadline.reset(token)
+
+
+def _retry_after(response_headers) -> float | None:
+    """Return the delay requested by a Retry-After header, in seconds or as an HTTP date."""
+    value = response_headers.get(hdrs.RETRY_AFTER) if response_headers else None
+    if not value:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class CircuitBreaker:
+    """Fail fast after repeated failures of a host, trying it again after a cool-down.
+
+    After CIRCUIT_FAILURE_THRESHOLD consecutive failed requests the circuit opens
+    and requests fail right away. Once CIRCUIT_RESET_TIMEOUT has passed a single
+    trial request is let through; its outcome closes or reopens the circuit.
+    """
+
+    def __init__(
+            self,
+            failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+            reset_timeout: float = CIRCUIT_RESET_TIMEOUT
+    ) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: float | None = None
+        self.rejected = 0
+        self._trial = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+
+        return "half_open" if time.monotonic() - self.opened_at >= self.reset_timeout else "open"
+
+    def before_request(self) -> bool:
+        """Raise CircuitOpenError when the host should not be contacted.
+
+        Returns whether the request is the trial, which must be ended with end_trial.
+        """
+        state = self.state
+        if state == "closed":
+            return False
+
+        if state == "half_open" and not self._trial:
+            self._trial = True
+            return True
+
+        self.rejected += 1
+        raise CircuitOpenError(f"Circuit open after {self.failures} consecutive failures")
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._trial = False
+        if self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+    def end_trial(self) -> None:
+        """Let another trial through, also when the trial ended without an outcome."""
+        self._trial = False
+
+    def as_dict(self) -> dict[str, Any]:
+        return {"state": self.state, "failures": self.failures, "rejected": self.rejected}
+
+
+@dataclass
+class CachedResponse:
+    """Validators and parsed result of the last response of a conditional request."""
+
+    etag: str | None
+    last_modified: str | None
+    digest: bytes
+    parsed: Any
+
+
+@dataclass
+class ResponseStats:
+    """Count how often conditional requests could skip downloading or parsing."""
+
+    not_modified: int = 0
+    unchanged: int = 0
+    parsed: int = 0
+
+    @property
+    def parses_skipped(self) -> int:
+        return self.not_modified + self.unchanged
+
+
+@dataclass
+class LatencyHistogram:
+    """Count durations into fixed buckets, keeping the total and maximum."""
+
+    count: int = 0
+    total: float = 0.0
+    max: float = 0.0
+    last: float | None = None
+    buckets: list[int] = field(default_factory=lambda: [0] * (len(LATENCY_BUCKETS) + 1))
+
+    @property
+    def mean(self) -> float | None:
+        return self.total / self.count if self.count else None
+
+    def record(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.last = seconds
+        self.buckets[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "max": self.max,
+            "last": self.last,
+            "buckets": {
+                f"le_{bound}": count for bound, count in zip((*LATENCY_BUCKETS, "inf"), self.buckets)
+            },
+        }
+
+
+@dataclass
+class EndpointStats:
+    """Latency, retries, errors, transfer and parse time of a single API endpoint."""
+
+    requests: int = 0
+    retries: int = 0
+    backoff_seconds: float = 0.0
+    errors: int = 0
+    last_error: str | None = None
+    bytes_received: int = 0
+    parse_seconds: float = 0.0
+    latency: LatencyHistogram = field(default_factory=LatencyHistogram)
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "retries": self.retries,
+            "backoff_seconds": self.backoff_seconds,
+            "errors": self.errors,
+            "last_error": self.last_error,
+            "bytes_received": self.bytes_received,
+            "parse_seconds": self.parse_seconds,
+            "latency": self.latency.as_dict(),
+        }
+
+
+@dataclass
+class ConnectionStats:
+    """Count new and reused connections of a client session."""
+
+    created: int = 0
+    reused: int = 0
+
+    def trace_config(self) -> TraceConfig:
+        """Return a trace config which feeds these stats."""
+        trace_config = TraceConfig()
+        trace_config.on_connection_create_end.append(self._on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(self._on_connection_reuseconn)
+        return trace_config
+
+    async def _on_connection_create_end(self, session, trace_config_ctx, params) -> None:
+        self.created += 1
+
+    async def _on_connection_reuseconn(self, session, trace_config_ctx, params) -> None:
+        self.reused += 1
+
+
+class ApiClient:
+    """Base class for the asyncio based Budget Thuis API clients."""
+
+    baseUrlAccounts: str
+
+    def __init__(
+            self,
+            session: ClientSession,
+            access_token: str,
+            base_url: str | None = None,
+            circuit_breaker: CircuitBreaker | None = None
+    ):
+        self.session = session
+        if base_url is not None:
+            self.baseUrlAccounts = base_url.rstrip("/")
+        # Pass a shared breaker to let clients of the same host fail fast together.
+        self.circuit_breaker = circuit_breaker or CircuitBreaker()
+        self.headers = {
+            hdrs.ACCEPT_ENCODING: ACCEPT_ENCODING
+        }
+        self.response_stats = ResponseStats()
+        self.endpoint_stats: dict[str, EndpointStats] = {}
+        self._responses: dict[str, CachedResponse] = {}
+        self.access_token = access_token
+        self.set_access_token(access_token)
+        # Called with the rejected token when the API answers 401, returns a fresh token.
+        self.token_refresher: Callable[[str], Awaitable[str]] | None = None
+
+    def set_access_token(self, access_token: str) -> None:
+        """Use a new bearer token for subsequent requests."""
+        self.access_token = access_token
+        self.headers["Authorization"] = "Bearer " + access_token
+
+    async def _request(
+            self,
+            method: str,
+            path: str,
+            parse: Callable[[Any], Any] | None = None,
+            conditional: bool = False,
+            endpoint: str | None = None,
+            background: bool = False,
+            **kwargs
+    ) -> Any:
+        """Perform a request and return the decoded JSON body, passed through parse.
+
+        Conditional GET requests send the validators of the previous response. When the
+        server answers 304, or the body hashes the same as last time, the previously
+        parsed result is returned without decoding or parsing anything.
+
+        Connection errors, timeouts and RETRY_STATUSES are retried with a jittered
+        exponential backoff, or after the delay a 429 or 503 asks for with Retry-After, capped
+        at RETRY_BACKOFF_MAX.
+        Retries stop early when the next one would run past the retry_budget. A 401
+        refreshes the token and retries the request once.
+
+        Requests to a host whose circuit breaker is open fail right away with
+        CircuitOpenError, so callers can fall back to cached data. A request
+        counts as a single failure once its retries are used up, and stops
+        retrying when the circuit opens. Background requests, such as backfill
+        chunks, never count, so they can't shut out the live refresh.
+
+        Every attempt is recorded in the stats of the endpoint, which defaults to the path.
+        """
+        stats = self.endpoint_stats.setdefault(endpoint or path, EndpointStats())
+        try:
+            return await self._request_with_retries(method, path, parse, conditional, stats, background, **kwargs)
+        except Exception as exception:
+            stats.errors += 1
+            stats.last_error = str(exception) or type(exception).__name__
+            raise
+
+    async def _async_backoff(
+            self,
+            path: str,
+            exception: Exception,
+            attempt: int,
+            stats: EndpointStats,
+            background: bool,
+            retry_after: float | None = None
+    ) -> None:
+        """Sleep before the next attempt, or re-raise when retries or budget are used up."""
+        if attempt >= RETRY_TOTAL or self.circuit_breaker.state != "closed":
+            self._give_up(exception, background)
+
+        if retry_after is not None:
+            # Outside a retry_budget nothing else bounds what the server asks for.
+            backoff = min(RETRY_BACKOFF_MAX, retry_after)
+        elif attempt:
+            backoff = min(RETRY_BACKOFF_MAX, RETRY_BACKOFF_FACTOR * (2 ** attempt))
+            backoff *= random.uniform(RETRY_JITTER, 1)
+        else:
+            backoff = 0
+
+        deadline = _retry_deadline.get()
+        if deadline is not None and time.monotonic() + backoff > deadline:
+            _LOGGER.debug("Request to %s failed (%s), retry budget used up", path, exception)
+            self._give_up(exception, background)
+
+        stats.retries += 1
+        stats.backoff_seconds += backoff
+        _LOGGER.debug("Request to %s failed (%s), retry %d in %.1fs", path, exception, attempt + 1, backoff)
+        await asyncio.sleep(backoff)
+
+    def _give_up(self, exception: Exception, background: bool) -> None:
+        """Count the failed request in the circuit breaker and re-raise its last error."""
+        if not background:
+            self.circuit_breaker.record_failure()
+
+        raise exception
+
+    async def _request_with_retries(
+            self,
+            method: str,
+            path: str,
+            parse: Callable[[Any], Any] | None,
+            conditional: bool,
+            stats: EndpointStats,
+            background: bool,
+            **kwargs
+    ) -> Any:
+        attempt = 0
+        token_refreshed = False
+        cache_key = f"{method} {path}"
+        cached = self._responses.get(cache_key) if conditional else None
+
+        while True:
+            headers = dict(self.headers)
+            # Other methods answer a matching validator with 412, those rely on the body hash alone.
+            if cached is not None and method in (hdrs.METH_GET, hdrs.METH_HEAD):
+                if cached.etag:
+                    headers[hdrs.IF_NONE_MATCH] = cached.etag
+                if cached.last_modified:
+                    headers[hdrs.IF_MODIFIED_SINCE] = cached.last_modified
+
+            trial = self.circuit_breaker.before_request()
+            stats.requests += 1
+            started = time.monotonic()
+            try:
+                async with self.session.request(
+                        method,
+                        self.baseUrlAccounts + path,
+                        headers=headers,
+                        timeout=REQUEST_TIMEOUT,
+                        **kwargs
+                ) as response:
+                    if response.status == 304 and cached is not None:
+                        stats.latency.record(time.monotonic() - started)
+                        self.circuit_breaker.record_success()
+                        self.response_stats.not_modified += 1
+                        return cached.parsed
+
+                    response.raise_for_status()
+                    body = await response.read()
+                    stats.latency.record(time.monotonic() - started)
+                    stats.bytes_received += len(body)
+                    etag = response.headers.get(hdrs.ETAG)
+                    last_modified = response.headers.get(hdrs.LAST_MODIFIED)
+                    self.circuit_breaker.record_success()
+                    break
+            except ClientResponseError as exception:
+                stats.latency.record(time.monotonic() - started)
+                if exception.status == 401 and not token_refreshed and self.token_refresher is not None:
+                    _LOGGER.debug("Request to %s was unauthorized, refreshing token", path)
+                    token_refreshed = True
+                    stats.retries += 1
+                    self.set_access_token(await self.token_refresher(self.access_token))
+                    continue
+
+                if exception.status not in RETRY_STATUSES:
+                    # The host answered, it is the request which is refused.
+                    self.circuit_breaker.record_success()
+                    raise
+
+                await self._async_backoff(
+                    path, exception, attempt, stats, background, _retry_after(exception.headers)
+                )
+                attempt += 1
+            except (ClientConnectionError, asyncio.TimeoutError) as exception:
+                await self._async_backoff(path, exception, attempt, stats, background)
+                attempt += 1
+            finally:
+                # A trial answered 401, or failing in another way, would otherwise keep the circuit open.
+                if trial:
+                    self.circuit_breaker.end_trial()
+
+        if not conditional:
+            started = time.monotonic()
+            result = loads(body)
+            result = parse(result) if parse else result
+            stats.parse_seconds += time.monotonic() - started
+            return result
+
+        # Servers without validators still send the same bytes when nothing changed.
+        digest = hashlib.blake2b(body, digest_size=16).digest()
+        if cached is not None and cached.digest == digest:
+            self.response_stats.unchanged += 1
+            cached.etag, cached.last_modified = etag, last_modified
+            return cached.parsed
+
+        started = time.monotonic()
+        result = loads(body)
+        parsed = parse(result) if parse else result
+        stats.parse_seconds += time.monotonic() - started
+        self.response_stats.parsed += 1
+        self._responses[cache_key] = CachedResponse(etag, last_modified, digest, parsed)
+
+        return parsed
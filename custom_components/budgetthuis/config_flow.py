@@ -1,8 +1,14 @@
 import logging
-from homeassistant.config_entries import ConfigEntry
-from homeassistant.helpers import config_entry_oauth2_flow
+import voluptuous as vol
+from homeassistant.components.sensor import DOMAIN as SENSOR_DOMAIN, SensorDeviceClass
+from homeassistant.config_entries import ConfigEntry, OptionsFlow
+from homeassistant.core import callback
+from homeassistant.helpers import config_entry_oauth2_flow, selector
 
-from .const import DOMAIN
+from .const import (CONF_CHEAPEST_HOURS_PER_DAY, CONF_CHEAPEST_WINDOW_HOURS, CONF_CONTRACT_DISCOVERY_INTERVAL,
+                    CONF_ENERGY_CONTRACT, CONF_ENERGY_SENSOR, CONF_MAX_CONCURRENT_FETCHES, CONF_PRICE_THRESHOLD,
+                    DEFAULT_CHEAPEST_HOURS_PER_DAY, DEFAULT_CHEAPEST_WINDOW_HOURS, DEFAULT_CONTRACT_DISCOVERY_INTERVAL,
+                    DEFAULT_MAX_CONCURRENT_FETCHES, DEFAULT_PRICE_THRESHOLD, DOMAIN)
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -16,6 +22,12 @@ class OAuth2FlowHandler(
 
     reauth_entry: ConfigEntry | None = None
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry: ConfigEntry) -> OptionsFlow:
+        """Get the options flow for this handler."""
+        return BudgetThuisOptionsFlow()
+
     @property
     def logger(self) -> logging.Logger:
         """Return logger."""
@@ -44,3 +56,60 @@ class OAuth2FlowHandler(
             return self.async_abort(reason="reauth_successful")
 
         return await super().async_oauth_create_entry(data)
+
+
+class BudgetThuisOptionsFlow(OptionsFlow):
+    """Handle Budget Thuis options."""
+
+    async def async_step_init(self, user_input=None):
+        """Manage the options."""
+        if user_input is not None:
+            return self.async_create_entry(data=user_input)
+
+        options = self.config_entry.options
+        entry_data = self.hass.data.get(DOMAIN, {}).get(self.config_entry.entry_id)
+        contracts = {
+            contract.id: f"{contract.id} - {contract.supplyAddress.street} {contract.supplyAddress.houseNumber}"
+            for contract in (entry_data['coordinator'].contracts if entry_data else [])
+            if contract.contractType == "Dynamic"
+        }
+
+        return self.async_show_form(
+            step_id="init",
+            data_schema=vol.Schema(
+                {
+                    vol.Required(
+                        CONF_MAX_CONCURRENT_FETCHES,
+                        default=options.get(CONF_MAX_CONCURRENT_FETCHES, DEFAULT_MAX_CONCURRENT_FETCHES)
+                    ): vol.All(vol.Coerce(int), vol.Range(min=1, max=16)),
+                    vol.Required(
+                        CONF_CONTRACT_DISCOVERY_INTERVAL,
+                        default=options.get(CONF_CONTRACT_DISCOVERY_INTERVAL, DEFAULT_CONTRACT_DISCOVERY_INTERVAL)
+                    ): vol.All(vol.Coerce(int), vol.Range(min=1, max=168)),
+                    vol.Required(
+                        CONF_CHEAPEST_WINDOW_HOURS,
+                        default=options.get(CONF_CHEAPEST_WINDOW_HOURS, DEFAULT_CHEAPEST_WINDOW_HOURS)
+                    ): vol.All(vol.Coerce(int), vol.Range(min=1, max=24)),
+                    vol.Required(
+                        CONF_PRICE_THRESHOLD,
+                        default=options.get(CONF_PRICE_THRESHOLD, DEFAULT_PRICE_THRESHOLD)
+                    ): vol.All(vol.Coerce(float), vol.Range(min=-1, max=5)),
+                    vol.Required(
+                        CONF_CHEAPEST_HOURS_PER_DAY,
+                        default=options.get(CONF_CHEAPEST_HOURS_PER_DAY, DEFAULT_CHEAPEST_HOURS_PER_DAY)
+                    ): vol.All(vol.Coerce(int), vol.Range(min=1, max=24)),
+                    vol.Optional(
+                        CONF_ENERGY_SENSOR,
+                        description={"suggested_value": options.get(CONF_ENERGY_SENSOR)}
+                    ): selector.EntitySelector(
+                        selector.EntitySelectorConfig(domain=SENSOR_DOMAIN, device_class=SensorDeviceClass.ENERGY)
+                    ),
+                    **({
+                        vol.Optional(
+                            CONF_ENERGY_CONTRACT,
+                            description={"suggested_value": options.get(CONF_ENERGY_CONTRACT)}
+                        ): vol.In(contracts),
+                    } if contracts else {}),
+                }
+            )
+        )
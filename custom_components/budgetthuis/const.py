@@ -1,12 +1,78 @@
+from datetime import time, timedelta
 from homeassistant.const import Platform
 
 DOMAIN = "budgetthuis"
 BUDGETTHUIS_CLIENT_ID = "mobile"
-BUDGETTHUIS_AUTH_URL = "https://accounts.budgetthuis.nl/connect/authorize"
-BUDGETTHUIS_TOKEN_URL = "https://accounts.budgetthuis.nl/connect/token"
+BUDGETTHUIS_ACCOUNTS_URL = "https://accounts.budgetthuis.nl"
+BUDGETTHUIS_AUTH_PATH = "/connect/authorize"
+BUDGETTHUIS_TOKEN_PATH = "/connect/token"
+NUTSSERVICES_API_URL = "https://app.api.nutsservices.nl"
 BUDGETTHUIS_REDIRECT_URI = "budgetthuis://login_success"
 BUDGETTHUIS_SCOPE = "mobileApi offline_access openid email idsServiceExternal"
 
+# Base URLs can be pointed at a stand-in server from configuration.yaml.
+CONF_ACCOUNTS_URL = "accounts_url"
+CONF_API_URL = "api_url"
+
+CONF_MAX_CONCURRENT_FETCHES = "max_concurrent_fetches"
+DEFAULT_MAX_CONCURRENT_FETCHES = 4
+CONF_CONTRACT_DISCOVERY_INTERVAL = "contract_discovery_interval"
+DEFAULT_CONTRACT_DISCOVERY_INTERVAL = 24
+CONF_CHEAPEST_WINDOW_HOURS = "cheapest_window_hours"
+DEFAULT_CHEAPEST_WINDOW_HOURS = 3
+# Binary sensors flip when the price crosses the threshold, by default at negative prices.
+CONF_PRICE_THRESHOLD = "price_threshold"
+DEFAULT_PRICE_THRESHOLD = 0.0
+CONF_CHEAPEST_HOURS_PER_DAY = "cheapest_hours_per_day"
+DEFAULT_CHEAPEST_HOURS_PER_DAY = 4
+# Energy sensor whose hourly consumption statistics are priced at the tariffs.
+CONF_ENERGY_SENSOR = "energy_sensor"
+# Contract the energy sensor measures, required when an entry has several dynamic contracts.
+CONF_ENERGY_CONTRACT = "energy_contract"
+
+ATTR_CONFIG_ENTRY_ID = "config_entry_id"
+ATTR_CONTRACT_ID = "contract_id"
+ATTR_HOURS = "hours"
+ATTR_START = "start"
+ATTR_END = "end"
+ATTR_COMPONENT = "component"
+ATTR_AMOUNT = "amount"
+ATTR_AGGREGATION = "aggregation"
+AGGREGATION_NONE = "none"
+AGGREGATION_HOURLY = "hourly"
+AGGREGATION_DAILY = "daily"
+SERVICE_REFRESH_CONTRACTS = "refresh_contracts"
+SERVICE_FIND_CHEAPEST_WINDOW = "find_cheapest_window"
+SERVICE_BACKFILL_TARIFFS = "backfill_tariffs"
+SERVICE_GET_TARIFFS = "get_tariffs"
+
 PLATFORMS = [
+    Platform.BINARY_SENSOR,
     Platform.SENSOR
 ]
+
+# Day-ahead prices are published once a day, in the afternoon (Dutch time).
+TARIFF_TIME_ZONE = "Europe/Amsterdam"
+TARIFF_PUBLICATION_TIME = time(15, 0)
+TARIFF_HORIZON_MARGIN = timedelta(hours=2)
+TARIFF_RETRY_INTERVAL = timedelta(hours=1)
+TARIFF_HISTORY_RETENTION = timedelta(days=90)
+
+# Prices in the cheapest and most expensive quarter of their day are flagged.
+PRICE_CHEAP_PERCENTILE = 25
+PRICE_EXPENSIVE_PERCENTILE = 75
+PRICE_LEVEL_CHEAP = "cheap"
+PRICE_LEVEL_NORMAL = "normal"
+PRICE_LEVEL_EXPENSIVE = "expensive"
+PRICE_AVERAGE_DAYS = 7
+
+USERINFO_TTL = timedelta(days=7)
+
+# Offset between the hourly refreshes of config entries, so they don't hit the API at once.
+REFRESH_STAGGER = timedelta(seconds=30)
+
+# Time a single refresh may spend waiting on retries, after that cached tariffs are served.
+REFRESH_RETRY_BUDGET = timedelta(minutes=2)
+
+BACKFILL_CHUNK = timedelta(days=7)
+BACKFILL_CHUNK_DELAY = timedelta(seconds=10)
@@ -1,17 +1,33 @@
+import asyncio
 import logging
-import requests
-from datetime import timedelta
-from homeassistant.core import HomeAssistant
+import time
+from aiohttp import ClientError
+from datetime import datetime, timedelta
+from homeassistant.core import HassJob, HomeAssistant, callback
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers.event import async_call_later, async_track_point_in_utc_time
 from homeassistant.helpers.update_coordinator import (DataUpdateCoordinator,
                                                       UpdateFailed)
 from homeassistant.util import utcnow
+from sqlalchemy.exc import SQLAlchemyError
+from typing import TYPE_CHECKING, Any
 
-from . import AsyncConfigEntryAuth
+from .analytics import PriceAnalyzer
 from .budget_thuis import BudgetThuis
-from .const import DOMAIN
+from .client import EndpointStats, LatencyHistogram, retry_budget
+from .const import (CONF_CHEAPEST_WINDOW_HOURS, CONF_CONTRACT_DISCOVERY_INTERVAL, CONF_ENERGY_CONTRACT,
+                    CONF_ENERGY_SENSOR, CONF_MAX_CONCURRENT_FETCHES, DEFAULT_CHEAPEST_WINDOW_HOURS,
+                    DEFAULT_CONTRACT_DISCOVERY_INTERVAL, DEFAULT_MAX_CONCURRENT_FETCHES, DOMAIN, REFRESH_RETRY_BUDGET)
+from .costs import EnergyCostEngine
 from .nutsservices import Nutsservices
+from .optimizer import CheapestWindowOptimizer
+from .statistics import async_fill_tariff_statistics, async_import_tariff_statistics
+from .store import BudgetThuisStore
 from .structs.contract import Contract
-from .structs.hourly_tariff import HourlyTariff
+from .tariff_cache import SharedTariffCaches, TariffCache
+
+if TYPE_CHECKING:
+    from . import AsyncConfigEntryAuth
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -20,7 +36,7 @@ class BudgetThuisCoordinator(DataUpdateCoordinator):
     budget_thuis_api: BudgetThuis
     nutsservices_api: Nutsservices
 
-    def __init__(self, hass: HomeAssistant) -> None:
+    def __init__(self, hass: HomeAssistant, store: BudgetThuisStore) -> None:
         """Initialize Budget Thuis coordinator."""
         super().__init__(
             hass,
@@ -28,40 +44,349 @@ class BudgetThuisCoordinator(DataUpdateCoordinator):
             name="Budget Thuis",
             update_interval=timedelta(minutes=60),
         )
+        self.store = store
+        self.contracts: list[Contract] = []
+        self.contracts_discovered_at: datetime | None = None
+        # Shared with the other config entries, which may have the same contracts.
+        self.shared_caches: SharedTariffCaches = hass.data.setdefault(DOMAIN, {}).setdefault(
+            'tariff_caches', SharedTariffCaches()
+        )
+        self.tariff_errors: dict[int, str] = {}
+        self.optimizers: dict[int, CheapestWindowOptimizer] = {}
+        self.analyzers: dict[int, PriceAnalyzer] = {}
+        self.cost_engine: EnergyCostEngine | None = None
+        self.statistics_filled: set[int] = set()
+        self.update_duration = LatencyHistogram()
+        self._boundary_job = HassJob(self._handle_tariff_boundary, cancel_on_shutdown=True)
+        self._unsub_boundary = None
+        self._stagger_job = HassJob(self._handle_staggered_refresh, cancel_on_shutdown=True)
+        self._unsub_stagger = None
+
+    def restore(self, snapshot: dict) -> None:
+        """Publish the data of a stored snapshot without touching the API."""
+        now = utcnow()
+        self.contracts = snapshot['contracts']
+        self.contracts_discovered_at = snapshot['contracts_discovered_at']
+        self.shared_caches.restore(snapshot['tariff_caches'])
+        self.async_set_updated_data(self._build_data(now))
+        self._async_schedule_tariff_boundary(now)
+
+    @property
+    def tariff_caches(self) -> dict[int, TariffCache]:
+        """Return the shared tariff caches of the contracts of this config entry."""
+        caches = self.shared_caches.caches
+
+        return {contract.id: caches[contract.id] for contract in self.contracts if contract.id in caches}
+
+    @property
+    def endpoint_stats(self) -> dict[str, EndpointStats]:
+        """Return the request stats of every endpoint, token refreshes included."""
+        entry_data = self.hass.data[DOMAIN][self.config_entry.entry_id]
+
+        return {
+            'token': entry_data['auth'].token_stats,
+            **entry_data['budget_thuis'].endpoint_stats,
+            **entry_data['nutsservices'].endpoint_stats,
+        }
+
+    async def async_refresh_contracts(self) -> None:
+        """Discover the contracts of the customer again and refresh right away."""
+        self.contracts_discovered_at = None
+        await self.async_refresh()
+
+    def _contract_discovery_due(self, now: datetime) -> bool:
+        if self.contracts_discovered_at is None:
+            return True
+
+        interval = timedelta(
+            hours=self.config_entry.options.get(CONF_CONTRACT_DISCOVERY_INTERVAL, DEFAULT_CONTRACT_DISCOVERY_INTERVAL)
+        )
+
+        return now - self.contracts_discovered_at >= interval
+
+    async def async_shutdown(self) -> None:
+        """Cancel the tariff boundary and staggered refresh timers."""
+        await super().async_shutdown()
+        self._async_cancel_tariff_boundary()
+        if self._unsub_stagger:
+            self._unsub_stagger()
+            self._unsub_stagger = None
+
+    @callback
+    def async_schedule_staggered_refresh(self, delay: timedelta) -> None:
+        """Refresh after a delay; later hourly refreshes keep the same offset."""
+        self._unsub_stagger = async_call_later(self.hass, delay, self._stagger_job)
+
+    @callback
+    def _handle_staggered_refresh(self, _now: datetime) -> None:
+        self._unsub_stagger = None
+        self.config_entry.async_create_background_task(
+            self.hass, self.async_refresh(), f"{DOMAIN} {self.config_entry.entry_id} refresh"
+        )
+
+    @callback
+    def _async_cancel_tariff_boundary(self) -> None:
+        if self._unsub_boundary:
+            self._unsub_boundary()
+            self._unsub_boundary = None
+
+    @callback
+    def _async_schedule_tariff_boundary(self, now: datetime) -> None:
+        """Arm a single timer for the next tariff change of any contract."""
+        self._async_cancel_tariff_boundary()
+
+        changes = [
+            change
+            for change in (cache.timeline.next_change(now) for cache in self.tariff_caches.values())
+            if change is not None
+        ]
+        if not changes:
+            return
+
+        self._unsub_boundary = async_track_point_in_utc_time(self.hass, self._boundary_job, min(changes))
+
+    @callback
+    def _handle_tariff_boundary(self, point_in_time: datetime) -> None:
+        """Resolve the new current tariffs once and push them to all entities."""
+        self._unsub_boundary = None
+        now = max(point_in_time, utcnow())
+
+        self.data = self._build_data(now)
+        self.async_update_listeners()
+        self._async_schedule_tariff_boundary(now)
+
+    def _build_data(self, now: datetime) -> dict[int, dict[str, Any]]:
+        data: dict[int, dict[str, Any]] = {}
+        hours = self.config_entry.options.get(CONF_CHEAPEST_WINDOW_HOURS, DEFAULT_CHEAPEST_WINDOW_HOURS)
+
+        for contract in self.contracts:
+            if contract.contractType != "Dynamic":
+                continue
+
+            cache = self.shared_caches.caches.get(contract.id) or TariffCache()
+
+            # Only recomputed when new tariffs arrived or the previous result has passed.
+            optimizer = self.optimizers.setdefault(contract.id, CheapestWindowOptimizer())
+            optimizer.update(cache.timeline, hours, now)
+            analyzer = self.analyzers.setdefault(contract.id, PriceAnalyzer())
+            analyzer.update(cache.timeline, now)
+
+            data[contract.id] = {
+                'contract': contract,
+                'timeline': cache.timeline,
+                'current_tariff': cache.current(now),
+                'cheapest_window': optimizer.window,
+                'cheapest_hours': optimizer.hours,
+                'analyzer': analyzer,
+                'analytics': analyzer.at(now),
+                'cost': self.cost_engine.cost
+                if self.cost_engine and self.cost_engine.contract_id == contract.id else None,
+                'error': self.tariff_errors.get(contract.id)
+            }
+
+        return data
 
     async def _async_update_data(self):
+        started = time.monotonic()
+        try:
+            # Retries of all requests of this refresh share one time budget.
+            with retry_budget(REFRESH_RETRY_BUDGET.total_seconds()):
+                return await self._async_update()
+        finally:
+            self.update_duration.record(time.monotonic() - started)
+            _LOGGER.debug("Update took %.3fs", self.update_duration.last)
+
+    async def _async_update(self) -> dict[int, dict[str, Any]]:
         _LOGGER.debug('Get latest data.')
+        # What the stored snapshot holds, so it is only rewritten when any of it changed.
+        saved_state = self._snapshot_state()
         try:
-            auth: AsyncConfigEntryAuth = self.hass.data[DOMAIN][self.config_entry.entry_id]['auth']
-            await auth.check_and_refresh_token()
+            entry_data = self.hass.data[DOMAIN][self.config_entry.entry_id]
+            auth: AsyncConfigEntryAuth = entry_data['auth']
+            try:
+                await auth.check_and_refresh_token()
+            except HomeAssistantError as exception:
+                # Nothing can be fetched without a token, the cached tariffs are still valid.
+                _LOGGER.warning("Unable to refresh the token, serving cached tariffs: %s", exception)
+                return self._cached_data(utcnow(), str(exception) or type(exception).__name__)
+
+            self.budget_thuis_api = entry_data['budget_thuis']
+            self.nutsservices_api = entry_data['nutsservices']
 
-            self.budget_thuis_api = BudgetThuis(auth.access_token)
-            self.nutsservices_api = Nutsservices(auth.access_token)
+            now = utcnow()
 
-            data: list[dict[str, Contract | list[HourlyTariff]]] = []
+            try:
+                entry_data['userinfo'] = await auth.async_get_user_info()
+            except (ClientError, asyncio.TimeoutError, HomeAssistantError) as exception:
+                _LOGGER.debug("Unable to refresh user information, keeping the cached copy: %s", exception)
 
-            contracts = await self.hass.async_add_executor_job(self.nutsservices_api.all_contracts)
-            _LOGGER.debug("Found %d contracts", len(contracts))
-            for contract in contracts:
-                if contract.contractType != "Dynamic":
-                    _LOGGER.debug("Skipping contract %d, not a dynamic contract.", contract.id)
-                    continue
+            # Contracts hardly ever change, so they are discovered on a much slower cadence than tariffs.
+            if self._contract_discovery_due(now):
+                try:
+                    self.contracts = await self.nutsservices_api.all_contracts()
+                    self.contracts_discovered_at = now
+                    _LOGGER.debug("Found %d contracts", len(self.contracts))
+                except (ClientError, asyncio.TimeoutError, HomeAssistantError) as exception:
+                    if not self.contracts:
+                        raise
 
-                tariffs = await self.hass.async_add_executor_job(self.nutsservices_api.hourly_tariff, contract.id)
-                _LOGGER.debug("Found %d tariff entries", len(tariffs))
+                    _LOGGER.warning("Unable to discover contracts, keeping the known ones: %s", exception)
+        except (ClientError, asyncio.TimeoutError, HomeAssistantError) as exception:
+            raise UpdateFailed("Unable to update Budget Thuis data") from exception
 
-                current_tariff = None
+        dynamic_contracts: list[Contract] = []
+        for contract in self.contracts:
+            if contract.contractType != "Dynamic":
+                _LOGGER.debug("Skipping contract %d, not a dynamic contract.", contract.id)
+                continue
 
-                for tariff in tariffs:
-                    if tariff.periodFrom <= utcnow() <= tariff.periodTo:
-                        current_tariff = tariff
-                        break
+            dynamic_contracts.append(contract)
 
-                data.append({
-                    'contract': contract,
-                    'current_tariff': current_tariff
-                })
+        for contract_id in set(self.optimizers) - {contract.id for contract in dynamic_contracts}:
+            del self.optimizers[contract_id]
+        for contract_id in set(self.analyzers) - {contract.id for contract in dynamic_contracts}:
+            del self.analyzers[contract_id]
+        self.shared_caches.prune(self._contracts_in_use())
 
-            return data
-        except requests.exceptions.RequestException as exception:
-            raise UpdateFailed("Unable to update Budget Thuis data") from exception
+        semaphore = asyncio.Semaphore(
+            self.config_entry.options.get(CONF_MAX_CONCURRENT_FETCHES, DEFAULT_MAX_CONCURRENT_FETCHES)
+        )
+        results = await asyncio.gather(
+            *(self._async_update_tariffs(contract, now, semaphore) for contract in dynamic_contracts),
+            return_exceptions=True
+        )
+
+        self.tariff_errors = {}
+        for contract, result in zip(dynamic_contracts, results):
+            if isinstance(result, (ClientError, asyncio.TimeoutError, HomeAssistantError)):
+                _LOGGER.warning("Unable to update tariffs of contract %d: %s", contract.id, result)
+                self.tariff_errors[contract.id] = str(result) or type(result).__name__
+            elif isinstance(result, BaseException):
+                raise result
+
+        # Only fail the whole refresh when there is nothing at all to show.
+        if dynamic_contracts and all(
+                contract.id in self.tariff_errors and not len(self.shared_caches.caches[contract.id].timeline)
+                for contract in dynamic_contracts
+        ):
+            raise UpdateFailed("Unable to update Budget Thuis tariffs")
+
+        # One batched statistics import per contract whose tariffs were fetched in this refresh.
+        if "recorder" in self.hass.config.components:
+            for contract in dynamic_contracts:
+                cache = self.shared_caches.caches[contract.id]
+                if contract.id not in self.statistics_filled:
+                    await self._async_fill_statistics(contract.id, cache)
+                # Only the entry whose refresh did the fetch imports, others joined its request.
+                elif cache.fetched_at == now:
+                    async_import_tariff_statistics(self.hass, contract.id, cache.last_fetched)
+
+            await self._async_update_costs(dynamic_contracts, now)
+
+        # The snapshot holds the whole retained history, don't rewrite it when nothing was fetched.
+        if self._snapshot_state() != saved_state:
+            self.store.async_schedule_save(
+                auth.userinfo or {},
+                auth.userinfo_fetched_at,
+                self.contracts,
+                self.contracts_discovered_at,
+                self.tariff_caches
+            )
+
+        connection_stats = entry_data['connection_stats']
+        _LOGGER.debug("Connections created: %d, reused: %d", connection_stats.created, connection_stats.reused)
+        response_stats = self.nutsservices_api.response_stats
+        _LOGGER.debug(
+            "Responses parsed: %d, parses skipped: %d (%d not modified, %d unchanged)",
+            response_stats.parsed, response_stats.parses_skipped,
+            response_stats.not_modified, response_stats.unchanged
+        )
+
+        self._async_schedule_tariff_boundary(now)
+
+        return self._build_data(now)
+
+    def _cached_data(self, now: datetime, error: str) -> dict[int, dict[str, Any]]:
+        """Return the cached tariffs when nothing could be fetched, with the error on every contract."""
+        dynamic_contracts = [contract for contract in self.contracts if contract.contractType == "Dynamic"]
+        self.tariff_errors = {contract.id: error for contract in dynamic_contracts}
+
+        # Only fail the whole refresh when there is nothing at all to show.
+        if not any(
+                contract.id in self.shared_caches.caches and len(self.shared_caches.caches[contract.id].timeline)
+                for contract in dynamic_contracts
+        ):
+            raise UpdateFailed(f"Unable to update Budget Thuis data: {error}")
+
+        self._async_schedule_tariff_boundary(now)
+
+        return self._build_data(now)
+
+    async def _async_update_costs(self, dynamic_contracts: list[Contract], now: datetime) -> None:
+        """Price the consumption of the configured energy sensor, for the hours not done yet."""
+        entity_id = self.config_entry.options.get(CONF_ENERGY_SENSOR)
+        contract_ids = [contract.id for contract in dynamic_contracts]
+        contract_id = self.config_entry.options.get(CONF_ENERGY_CONTRACT)
+
+        # The sensor measures a single supply, so it must not be charged to every contract.
+        if contract_id not in contract_ids:
+            contract_id = contract_ids[0] if len(contract_ids) == 1 else None
+
+        if not entity_id or contract_id is None:
+            if entity_id:
+                _LOGGER.warning("Select the contract the energy sensor %s measures in the options", entity_id)
+            self.cost_engine = None
+            return
+
+        if (
+                self.cost_engine is None
+                or self.cost_engine.entity_id != entity_id
+                or self.cost_engine.contract_id != contract_id
+        ):
+            self.cost_engine = EnergyCostEngine(self.hass, entity_id, contract_id)
+
+        try:
+            await self.cost_engine.async_update(self.shared_caches.caches[contract_id].timeline, now)
+        except (HomeAssistantError, SQLAlchemyError) as exception:
+            # Costs are picked up again from the imported statistics by the next refresh.
+            _LOGGER.warning("Unable to update the energy costs: %s", exception)
+
+    async def _async_fill_statistics(self, contract_id: int, cache: TariffCache) -> None:
+        """Once per start, import the cached tariffs after the last imported hour."""
+        try:
+            await async_fill_tariff_statistics(self.hass, contract_id, cache.timeline)
+        except (HomeAssistantError, SQLAlchemyError) as exception:
+            _LOGGER.warning("Unable to fill the tariff statistics of contract %d: %s", contract_id, exception)
+            return
+
+        self.statistics_filled.add(contract_id)
+
+    def _snapshot_state(self) -> tuple:
+        entry_data = self.hass.data[DOMAIN][self.config_entry.entry_id]
+
+        return (
+            entry_data['auth'].userinfo_fetched_at,
+            self.contracts_discovered_at,
+            {contract_id: cache.fetched_at for contract_id, cache in self.tariff_caches.items()},
+        )
+
+    def _contracts_in_use(self) -> set[int]:
+        """Return the dynamic contracts of all loaded config entries."""
+        domain_data = self.hass.data[DOMAIN]
+
+        return {
+            contract.id
+            for entry in self.hass.config_entries.async_entries(DOMAIN)
+            if entry.entry_id in domain_data
+            for contract in domain_data[entry.entry_id]['coordinator'].contracts
+            if contract.contractType == "Dynamic"
+        }
+
+    async def _async_update_tariffs(self, contract: Contract, now: datetime, semaphore: asyncio.Semaphore) -> None:
+        """Fetch the tariffs of a contract when its cached horizon is outdated."""
+
+        async def fetch():
+            async with semaphore:
+                return await self.nutsservices_api.hourly_tariff(contract.id)
+
+        await self.shared_caches.async_refresh(contract.id, now, fetch)
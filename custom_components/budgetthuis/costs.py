@@ -0,0 +1,172 @@
+"""Actual energy costs, joining the hourly consumption statistics with the tariffs."""
+import logging
+from bisect import bisect_right
+from dataclasses import dataclass
+from datetime import datetime
+from homeassistant.components.recorder import get_instance
+from homeassistant.components.recorder.models import StatisticData, StatisticMetaData
+from homeassistant.components.recorder.statistics import (async_add_external_statistics, get_last_statistics,
+                                                          statistics_during_period)
+from homeassistant.const import CURRENCY_EURO, UnitOfEnergy
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN
+from .structs.tariff_timeline import TariffTimeline, from_epoch
+
+_LOGGER = logging.getLogger(__name__)
+
+HOUR = 3600
+
+
+@dataclass
+class EnergyCost:
+    total: float = 0.0
+    # End of the last consumption hour which was processed, as epoch.
+    processed_until: int | None = None
+    last_hour: datetime | None = None
+    last_hour_energy: float | None = None
+    last_hour_cost: float | None = None
+
+
+def cost_statistic_id(contract_id: int) -> str:
+    return f"{DOMAIN}:contract_{contract_id}_electricity_cost"
+
+
+def hourly_costs(
+        timeline: TariffTimeline,
+        consumption: list[tuple[int, float]],
+        column: str = "total_gross"
+) -> list[tuple[int, float, float]]:
+    """Return (hour start, energy, cost) of the consumption hours, up to the first without a tariff.
+
+    Both series are sorted by start, so they are joined in a single pass that
+    only moves forward; the first period is found by bisecting. Hours with
+    several tariff periods are priced at their mean. Hours before the start of
+    the timeline are skipped, its history will never go back that far.
+    """
+    if not consumption:
+        return []
+
+    starts = timeline.starts
+    ends = timeline.ends
+    values = timeline.columns[column]
+    count = len(timeline)
+    index = bisect_right(ends, consumption[0][0])
+    costs = []
+
+    for hour, energy in consumption:
+        while index < count and ends[index] <= hour:
+            index += 1
+
+        stop = index
+        while stop < count and starts[stop] < hour + HOUR:
+            stop += 1
+
+        if stop == index:
+            if count and hour < starts[0]:
+                continue
+
+            # A gap, for example after an outage; priced once the tariffs are backfilled.
+            break
+
+        price = sum(values[index:stop]) / (stop - index)
+        costs.append((hour, energy, energy * price))
+
+    return costs
+
+
+class EnergyCostEngine:
+    """Keep the running energy cost of the contract an energy sensor measures.
+
+    The consumption of the sensor is read in bulk from the hourly long-term
+    statistics, starting at the first hour which wasn't priced yet. Costs are
+    imported as external statistics with a running sum, which is also where
+    the progress is picked up from after a restart.
+    """
+
+    def __init__(self, hass: HomeAssistant, entity_id: str, contract_id: int) -> None:
+        self.hass = hass
+        self.entity_id = entity_id
+        self.contract_id = contract_id
+        self.cost: EnergyCost | None = None
+        self._gap_reported: int | None = None
+
+    async def async_update(self, timeline: TariffTimeline, now: datetime) -> None:
+        """Add the costs of the hours consumed since the previous update."""
+        if self.cost is None:
+            self.cost = await self._async_last_cost()
+
+        cost = self.cost
+        if not len(timeline):
+            return
+
+        start = cost.processed_until if cost.processed_until is not None else timeline.starts[0]
+        consumption = await self._async_consumption(from_epoch(start), now)
+        hours = hourly_costs(timeline, consumption)
+
+        gap = hours[-1][0] + HOUR if hours else start
+        if consumption and consumption[-1][0] >= max(gap, timeline.starts[0]) and gap != self._gap_reported:
+            self._gap_reported = gap
+            _LOGGER.warning(
+                "No tariffs of contract %d known from %s, the energy cost continues once they are backfilled",
+                self.contract_id, from_epoch(gap).isoformat()
+            )
+
+        if not hours:
+            return
+
+        self._add_costs(cost, hours)
+        # Only up to the last priced hour, hours after a gap are read again by the next update.
+        cost.processed_until = hours[-1][0] + HOUR
+
+    async def _async_last_cost(self) -> EnergyCost:
+        statistic_id = cost_statistic_id(self.contract_id)
+        statistics = await get_instance(self.hass).async_add_executor_job(
+            get_last_statistics, self.hass, 1, statistic_id, False, {"sum"}
+        )
+        rows = statistics.get(statistic_id)
+        if not rows:
+            return EnergyCost()
+
+        return EnergyCost(total=rows[0]["sum"] or 0.0, processed_until=int(rows[0]["end"]))
+
+    async def _async_consumption(self, start: datetime, end: datetime) -> list[tuple[int, float]]:
+        statistics = await get_instance(self.hass).async_add_executor_job(
+            statistics_during_period,
+            self.hass,
+            start,
+            end,
+            {self.entity_id},
+            "hour",
+            {"energy": UnitOfEnergy.KILO_WATT_HOUR},
+            {"change"}
+        )
+
+        return [
+            (int(row["start"]), row["change"])
+            for row in statistics.get(self.entity_id, [])
+            if row.get("change") is not None
+        ]
+
+    def _add_costs(self, cost: EnergyCost, hours: list[tuple[int, float, float]]) -> None:
+        statistics: list[StatisticData] = []
+        for hour, energy, hour_cost in hours:
+            cost.total += hour_cost
+            statistics.append(StatisticData(start=from_epoch(hour), state=hour_cost, sum=cost.total))
+
+        hour, cost.last_hour_energy, cost.last_hour_cost = hours[-1]
+        cost.last_hour = from_epoch(hour)
+
+        async_add_external_statistics(self.hass, StatisticMetaData(
+            has_mean=False,
+            has_sum=True,
+            name=f"Budget Thuis {self.contract_id} electricity cost",
+            source=DOMAIN,
+            statistic_id=cost_statistic_id(self.contract_id),
+            unit_of_measurement=CURRENCY_EURO,
+        ), statistics)
+
+        _LOGGER.debug(
+            "Added the costs of %d hours of contract %d, up to %s",
+            len(hours), self.contract_id, cost.last_hour.isoformat()
+        )
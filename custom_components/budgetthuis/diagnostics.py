@@ -0,0 +1,55 @@
+"""Diagnostics support for Budget Thuis."""
+from dataclasses import asdict
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+from typing import Any
+
+from .const import DOMAIN
+from .coordinator import BudgetThuisCoordinator
+from .structs.contract import Contract
+
+TO_REDACT = {"access_token", "refresh_token", "id_token"}
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: ConfigEntry) -> dict[str, Any]:
+    """Return the request instrumentation and cache state of a config entry."""
+    entry_data = hass.data[DOMAIN][entry.entry_id]
+    coordinator: BudgetThuisCoordinator = entry_data['coordinator']
+
+    return {
+        "entry": {
+            "data": async_redact_data(entry.data, TO_REDACT),
+            "options": dict(entry.options),
+        },
+        "coordinator": {
+            "last_update_success": coordinator.last_update_success,
+            "update_duration": coordinator.update_duration.as_dict(),
+            "contracts_discovered_at": coordinator.contracts_discovered_at,
+            "tariff_errors": coordinator.tariff_errors,
+        },
+        "endpoints": {
+            endpoint: stats.as_dict() for endpoint, stats in coordinator.endpoint_stats.items()
+        },
+        "circuit_breakers": {
+            host: breaker.as_dict() for host, breaker in hass.data[DOMAIN].get('circuit_breakers', {}).items()
+        },
+        "connections": asdict(entry_data['connection_stats']),
+        "responses": asdict(entry_data['nutsservices'].response_stats),
+        # Only ids and types, the supply addresses are personal data.
+        "contracts": [_contract_diagnostics(coordinator, contract) for contract in coordinator.contracts],
+    }
+
+
+def _contract_diagnostics(coordinator: BudgetThuisCoordinator, contract: Contract) -> dict[str, Any]:
+    cache = coordinator.tariff_caches.get(contract.id)
+
+    return {
+        "id": contract.id,
+        "contract_type": contract.contractType,
+        "contract_status": contract.contractStatus,
+        "periods_cached": len(cache.timeline) if cache else 0,
+        "horizon_end": cache.horizon_end if cache else None,
+        "fetched_at": cache.fetched_at if cache else None,
+        "checked_at": cache.checked_at if cache else None,
+    }
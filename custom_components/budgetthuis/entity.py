@@ -0,0 +1,110 @@
+"""Base entities for Budget Thuis."""
+from abc import abstractmethod
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import callback
+from homeassistant.helpers.device_registry import DeviceEntryType
+from homeassistant.helpers.entity import DeviceInfo, EntityDescription
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+from typing import Any, Callable
+
+from .const import DOMAIN
+from .coordinator import BudgetThuisCoordinator
+from .structs.contract import Contract
+
+
+@callback
+def async_add_contract_entities(
+        coordinator: BudgetThuisCoordinator,
+        entry: ConfigEntry,
+        async_add_entities: AddEntitiesCallback,
+        entities_fn: Callable[[Contract], list["BudgetThuisContractEntity"]],
+) -> None:
+    """Add the entities of every contract, including contracts found by a later discovery."""
+    known_contracts: set[int] = set()
+
+    @callback
+    def _async_add_new_contracts() -> None:
+        """Create entities for contracts which don't have them yet."""
+        entities = []
+
+        for contract_id, contract in coordinator.data.items():
+            if contract_id in known_contracts:
+                continue
+
+            known_contracts.add(contract_id)
+            entities.extend(entities_fn(contract['contract']))
+
+        if entities:
+            async_add_entities(entities)
+
+    _async_add_new_contracts()
+
+    # New contracts get their entities without reloading the entry.
+    entry.async_on_unload(coordinator.async_add_listener(_async_add_new_contracts))
+
+
+class BudgetThuisEntity(CoordinatorEntity[BudgetThuisCoordinator]):
+    """Coordinator entity which only writes its state when it changed.
+
+    Every refresh and tariff boundary notifies all entities of the entry, while
+    most of them keep the same state. Skipping those writes saves the state
+    machine, the recorder and the frontend from handling unchanged states.
+    """
+
+    _written_state: tuple | None = None
+
+    @abstractmethod
+    def _update_state(self) -> None:
+        """Update the cached state and attributes from the coordinator."""
+
+    def _current_state(self) -> tuple:
+        return self.available, self.state, self.extra_state_attributes
+
+    async def async_added_to_hass(self) -> None:
+        """Remember the state written when the entity is added."""
+        await super().async_added_to_hass()
+        self._written_state = self._current_state()
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Handle updated data, pushed by a refresh or at a tariff boundary."""
+        self._update_state()
+
+        state = self._current_state()
+        if state == self._written_state:
+            return
+
+        self._written_state = state
+        self.async_write_ha_state()
+
+
+class BudgetThuisContractEntity(BudgetThuisEntity):
+    """Entity of a single contract, grouped on a device per contract."""
+
+    def __init__(
+            self,
+            coordinator: BudgetThuisCoordinator,
+            description: EntityDescription,
+            entry: ConfigEntry,
+            contract: Contract,
+    ) -> None:
+        self.entity_description = description
+        self.contract_id = contract.id
+        self._attr_unique_id = f"{entry.entry_id}.{contract.id}.{description.key}"
+
+        address = contract.supplyAddress
+        self._attr_device_info = DeviceInfo(
+            identifiers={(DOMAIN, f"{entry.entry_id}", f"{contract.id}")},
+            name=f"{contract.id} - {address.street} {address.houseNumber} {address.houseNumberExtension if address.houseNumberExtension else ''}",
+            manufacturer="Budget Thuis",
+            entry_type=DeviceEntryType.SERVICE,
+            configuration_url="https://www.budgetthuis.nl",
+        )
+
+        super().__init__(coordinator)
+
+    @property
+    def contract(self) -> dict[str, Any] | None:
+        """Return the latest coordinator data of this contract."""
+        return self.coordinator.data.get(self.contract_id)
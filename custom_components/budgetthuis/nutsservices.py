@@ -1,100 +1,64 @@
 import logging
-import requests
-from datetime import datetime
-from requests.adapters import HTTPAdapter
-from urllib3 import Retry
+from collections.abc import AsyncIterator
+from datetime import datetime, timedelta
 
-from .structs.contract import Contract, Address
-from .structs.hourly_tariff import HourlyTariff, AmountDetails
+from .client import ApiClient
+from .const import NUTSSERVICES_API_URL
+from .parser import parse_contracts, parse_hourly_tariff
+from .structs.contract import Contract
+from .structs.tariff_timeline import TariffTimeline
 
 _LOGGER = logging.getLogger(__name__)
 
 
-class Nutsservices:
-    baseUrlAccounts: str = "https://app.api.nutsservices.nl"
+class Nutsservices(ApiClient):
+    baseUrlAccounts: str = NUTSSERVICES_API_URL
 
-    def __init__(self, access_token: str):
-        self.client = requests.Session()
-        self.client.mount(
-            prefix='https://',
-            adapter=HTTPAdapter(
-                max_retries=Retry(
-                    total=5,
-                    backoff_factor=3
-                ),
-                pool_maxsize=25,
-                pool_block=True
-            )
-        )
-        self.client.headers = {
-            "Authorization": "Bearer " + access_token
-        }
-
-    def all_contracts(self) -> list[Contract]:
-        response = self.client.post(
-            url=self.baseUrlAccounts + "/energy/v1/customer/productPicker",
+    async def all_contracts(self) -> list[Contract]:
+        return await self._request(
+            "POST",
+            "/energy/v1/customer/productPicker",
+            parse=parse_contracts,
+            conditional=True,
+            endpoint="productPicker",
             json={
                 "relationIds": []
             }
         )
-        response.raise_for_status()
-
-        contracts: list[Contract] = []
 
-        for contract in response.json()['contractsInfo']:
-            contracts.append(
-                Contract(
-                    id=contract['contractId'],
-                    relationId=contract['relationId'],
-                    propositionType=contract['propositionType'],
-                    contractStatus=contract['contractStatus'],
-                    contractType=contract['contractType'],
-                    supplyAddress=Address(
-                        zipCode=contract['supplyAddress']['zipCode'],
-                        houseNumber=contract['supplyAddress']['houseNumber'],
-                        houseNumberExtension=contract['supplyAddress']['houseNumberExtension'] if contract[
-                                                                                                      'supplyAddress'] != "" else None,
-                        city=contract['supplyAddress']['city'],
-                        street=contract['supplyAddress']['street'],
-                    )
-                )
-            )
+    async def hourly_tariff(
+            self,
+            contract_id: int,
+            period_from: datetime | None = None,
+            period_to: datetime | None = None
+    ) -> TariffTimeline:
+        params = {}
+        if period_from is not None and period_to is not None:
+            params = {"periodFrom": period_from.isoformat(), "periodTo": period_to.isoformat()}
 
-        return contracts
-
-    def hourly_tariff(self, contract_id: int) -> list[HourlyTariff]:
-        response = self.client.get(
-            self.baseUrlAccounts + "/energy/v1/contract/" + str(contract_id) + "/dashboard/hourlytariff")
-        response.raise_for_status()
+        # Only the live horizon is fetched repeatedly, backfill chunks are requested once.
+        return await self._request(
+            "GET",
+            "/energy/v1/contract/" + str(contract_id) + "/dashboard/hourlytariff",
+            parse=parse_hourly_tariff,
+            conditional=not params,
+            endpoint="hourlytariff",
+            background=bool(params),
+            params=params
+        )
 
-        tariffs: list[HourlyTariff] = []
+    async def iter_hourly_tariffs(
+            self,
+            contract_id: int,
+            period_from: datetime,
+            period_to: datetime,
+            chunk: timedelta = timedelta(days=7)
+    ) -> AsyncIterator[TariffTimeline]:
+        """Stream the tariffs of a longer period, one chunk per request."""
+        chunk_from = period_from
 
-        for tariff in response.json()['electricityTariffs']:
-            tariffs.append(
-                HourlyTariff(
-                    total=AmountDetails(
-                        net=tariff['totalTariff']['amountNet'],
-                        vat=tariff['totalTariff']['amountVat'],
-                        gross=tariff['totalTariff']['amountGross']
-                    ),
-                    tax=AmountDetails(
-                        net=tariff['energyTax']['amountNet'],
-                        vat=tariff['energyTax']['amountVat'],
-                        gross=tariff['energyTax']['amountGross']
-                    ),
-                    surcharge=AmountDetails(
-                        net=tariff['surcharge']['amountNet'],
-                        vat=tariff['surcharge']['amountVat'],
-                        gross=tariff['surcharge']['amountGross']
-                    ),
-                    commodity=AmountDetails(
-                        net=tariff['commodity']['amountNet'],
-                        vat=tariff['commodity']['amountVat'],
-                        gross=tariff['commodity']['amountGross']
-                    ),
-                    periodFrom=datetime.fromisoformat(tariff['periodFrom']),
-                    periodTo=datetime.fromisoformat(tariff['periodTo'])
-                )
-            )
+        while chunk_from < period_to:
+            chunk_to = min(chunk_from + chunk, period_to)
+            yield await self.hourly_tariff(contract_id, chunk_from, chunk_to)
+            chunk_from = chunk_to
 
-        return tariffs
@@ -0,0 +1,125 @@
+"""Cheapest window calculations over the cached tariff horizon."""
+import heapq
+from dataclasses import dataclass
+from datetime import datetime
+from itertools import accumulate
+
+from .structs.tariff_timeline import TariffTimeline, from_epoch, to_epoch
+
+
+@dataclass
+class CheapestWindow:
+    start: datetime
+    end: datetime
+    average_price: float
+
+
+@dataclass
+class CheapestHours:
+    periods: list[tuple[datetime, float]]
+    average_price: float
+
+
+def _periods_for(timeline: TariffTimeline, first: int, hours: int) -> int:
+    """Return how many periods of the timeline cover the given number of hours."""
+    period = timeline.ends[first] - timeline.starts[first]
+
+    return max(1, round(hours * 3600 / period))
+
+
+def cheapest_window(
+        timeline: TariffTimeline,
+        hours: int,
+        start: datetime,
+        end: datetime | None = None,
+        column: str = "total_gross"
+) -> CheapestWindow | None:
+    """Return the cheapest contiguous window of the given length within [start, end).
+
+    Window sums come from a single prefix sum over the price column, so the
+    whole horizon is scanned in linear time.
+    """
+    indices = timeline.index_range(start, end or timeline.last_end or start)
+    if not indices:
+        return None
+
+    count = _periods_for(timeline, indices.start, hours)
+    if count > len(indices):
+        return None
+
+    starts = timeline.starts
+    ends = timeline.ends
+    values = timeline.columns[column][indices.start:indices.stop]
+    prefix = [0.0, *accumulate(values)]
+    span = ends[indices.start] - starts[indices.start]
+
+    best: int | None = None
+    best_sum = 0.0
+    for offset in range(len(values) - count + 1):
+        first = indices.start + offset
+        # Skip windows which run over a gap in the timeline.
+        if ends[first + count - 1] - starts[first] != span * count:
+            continue
+
+        window_sum = prefix[offset + count] - prefix[offset]
+        if best is None or window_sum < best_sum:
+            best = first
+            best_sum = window_sum
+
+    if best is None:
+        return None
+
+    return CheapestWindow(
+        start=from_epoch(starts[best]),
+        end=from_epoch(ends[best + count - 1]),
+        average_price=best_sum / count
+    )
+
+
+def cheapest_hours(
+        timeline: TariffTimeline,
+        hours: int,
+        start: datetime,
+        end: datetime | None = None,
+        column: str = "total_gross"
+) -> CheapestHours | None:
+    """Return the cheapest periods within [start, end), not necessarily contiguous."""
+    indices = timeline.index_range(start, end or timeline.last_end or start)
+    if not indices:
+        return None
+
+    count = min(_periods_for(timeline, indices.start, hours), len(indices))
+    values = timeline.columns[column]
+    cheapest = sorted(heapq.nsmallest(count, indices, key=values.__getitem__))
+
+    return CheapestHours(
+        periods=[(from_epoch(timeline.starts[index]), values[index]) for index in cheapest],
+        average_price=sum(values[index] for index in cheapest) / count
+    )
+
+
+class CheapestWindowOptimizer:
+    """Keep the cheapest window and hours of a contract until new tariffs arrive."""
+
+    def __init__(self) -> None:
+        self._timeline: TariffTimeline | None = None
+        self._hours: int | None = None
+        self._expires: int = 0
+        self.window: CheapestWindow | None = None
+        self.hours: CheapestHours | None = None
+
+    def update(self, timeline: TariffTimeline, hours: int, now: datetime) -> None:
+        """Recompute when the timeline or setting changed, or a result has passed."""
+        if timeline is self._timeline and hours == self._hours and to_epoch(now) < self._expires:
+            return
+
+        self._timeline = timeline
+        self._hours = hours
+        self.window = cheapest_window(timeline, hours, now)
+        self.hours = cheapest_hours(timeline, hours, now)
+
+        if self.window is None or self.hours is None:
+            self._expires = 0
+        else:
+            first_hour = timeline.index_at(self.hours.periods[0][0])
+            self._expires = min(to_epoch(self.window.end), timeline.ends[first_hour])
@@ -0,0 +1,101 @@
+"""Single-pass parsers for the Nutsservices responses."""
+import json
+from array import array
+from datetime import datetime
+from typing import Any, Callable
+
+from .structs.contract import Address, Contract
+from .structs.tariff_timeline import COLUMNS, TariffTimeline
+
+try:
+    import orjson
+    loads: Callable[[bytes], Any] = orjson.loads
+except ImportError:
+    loads = json.loads
+
+
+def parse_contracts(response: dict) -> list[Contract]:
+    contracts: list[Contract] = []
+
+    for contract in response['contractsInfo']:
+        address = contract['supplyAddress']
+        contracts.append(
+            Contract(
+                id=contract['contractId'],
+                relationId=contract['relationId'],
+                propositionType=contract['propositionType'],
+                contractStatus=contract['contractStatus'],
+                contractType=contract['contractType'],
+                supplyAddress=Address(
+                    zipCode=address['zipCode'],
+                    houseNumber=address['houseNumber'],
+                    houseNumberExtension=address['houseNumberExtension'] if address != "" else None,
+                    city=address['city'],
+                    street=address['street'],
+                )
+            )
+        )
+
+    return contracts
+
+
+def parse_hourly_tariff(response: dict) -> TariffTimeline:
+    """Parse the tariffs straight into the columns of a timeline.
+
+    Every tariff is visited once, each component dict is looked up once and
+    boundaries shared by consecutive periods are only converted once. Values
+    are collected in lists and copied into the typed arrays in one go.
+    """
+    epochs: dict[str, int] = {}
+    starts: list[int] = []
+    ends: list[int] = []
+    columns: tuple[list[float], ...] = tuple([] for _ in COLUMNS)
+
+    append_start = starts.append
+    append_end = ends.append
+    (
+        total_net, total_vat, total_gross,
+        tax_net, tax_vat, tax_gross,
+        surcharge_net, surcharge_vat, surcharge_gross,
+        commodity_net, commodity_vat, commodity_gross,
+    ) = (values.append for values in columns)
+
+    for tariff in response['electricityTariffs']:
+        period_from = tariff['periodFrom']
+        period_to = tariff['periodTo']
+
+        start = epochs.get(period_from)
+        if start is None:
+            start = epochs[period_from] = int(datetime.fromisoformat(period_from).timestamp())
+        end = epochs.get(period_to)
+        if end is None:
+            end = epochs[period_to] = int(datetime.fromisoformat(period_to).timestamp())
+
+        append_start(start)
+        append_end(end)
+
+        amounts = tariff['totalTariff']
+        total_net(amounts['amountNet'])
+        total_vat(amounts['amountVat'])
+        total_gross(amounts['amountGross'])
+
+        amounts = tariff['energyTax']
+        tax_net(amounts['amountNet'])
+        tax_vat(amounts['amountVat'])
+        tax_gross(amounts['amountGross'])
+
+        amounts = tariff['surcharge']
+        surcharge_net(amounts['amountNet'])
+        surcharge_vat(amounts['amountVat'])
+        surcharge_gross(amounts['amountGross'])
+
+        amounts = tariff['commodity']
+        commodity_net(amounts['amountNet'])
+        commodity_vat(amounts['amountVat'])
+        commodity_gross(amounts['amountGross'])
+
+    return TariffTimeline(
+        array('q', starts),
+        array('q', ends),
+        {column: array('d', values) for column, values in zip(COLUMNS, columns)}
+    ).sort()
@@ -0,0 +1,60 @@
+"""On/off signals over the cached tariff horizon, stored as the moments they flip."""
+from array import array
+from bisect import bisect_right
+from collections.abc import Callable
+from datetime import datetime
+
+from .structs.tariff_timeline import TariffTimeline, from_epoch, to_epoch
+
+
+class Schedule:
+    """States of a signal as sorted change moments, each state lasting until the next change.
+
+    A state of None means the signal is unknown there, such as in a gap in
+    the tariffs or past the end of the horizon. Lookups bisect the change
+    moments, so an entity only needs a timer for the next change.
+    """
+
+    __slots__ = ("changes", "states")
+
+    def __init__(self, changes: array, states: list[bool | None]) -> None:
+        self.changes = changes
+        self.states = states
+
+    @classmethod
+    def from_timeline(cls, timeline: TariffTimeline, start: datetime, is_on: Callable[[int], bool]) -> "Schedule":
+        """Evaluate the signal for every period from start on and keep the moments it flips."""
+        changes = array('q')
+        states: list[bool | None] = []
+        starts = timeline.starts
+        ends = timeline.ends
+        previous_end = None
+
+        for index in range(timeline.index_range(start, timeline.last_end or start).start, len(timeline)):
+            if previous_end is not None and starts[index] != previous_end:
+                changes.append(previous_end)
+                states.append(None)
+
+            state = is_on(index)
+            if not states or states[-1] != state:
+                changes.append(starts[index])
+                states.append(state)
+
+            previous_end = ends[index]
+
+        if previous_end is not None:
+            changes.append(previous_end)
+            states.append(None)
+
+        return cls(changes, states)
+
+    def state_at(self, when: datetime) -> bool | None:
+        position = bisect_right(self.changes, to_epoch(when)) - 1
+
+        return self.states[position] if position >= 0 else None
+
+    def next_change(self, after: datetime) -> datetime | None:
+        """Return the first change strictly after the given moment."""
+        position = bisect_right(self.changes, to_epoch(after))
+
+        return from_epoch(self.changes[position]) if position < len(self.changes) else None
@@ -1,23 +1,22 @@
 """Sensor for Budget Thuis packages."""
 import logging
 from dataclasses import dataclass
-from datetime import timedelta
-from homeassistant.components.sensor import SensorEntityDescription, SensorEntity, SensorStateClass
+from homeassistant.components.sensor import (SensorDeviceClass, SensorEntityDescription, SensorEntity,
+                                             SensorStateClass)
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import CURRENCY_EURO, UnitOfEnergy
-from homeassistant.core import HassJob, HomeAssistant
-from homeassistant.helpers import event
+from homeassistant.const import (CURRENCY_EURO, PERCENTAGE, EntityCategory, UnitOfEnergy, UnitOfInformation,
+                                 UnitOfTime)
+from homeassistant.core import HomeAssistant
 from homeassistant.helpers.device_registry import DeviceEntryType
 from homeassistant.helpers.entity import DeviceInfo
 from homeassistant.helpers.typing import StateType
-from homeassistant.helpers.update_coordinator import CoordinatorEntity
-from homeassistant.util import utcnow
-from typing import Any, Callable
+from typing import Callable
 
 from . import DOMAIN
+from .const import PRICE_LEVEL_CHEAP, PRICE_LEVEL_EXPENSIVE, PRICE_LEVEL_NORMAL
 from .coordinator import BudgetThuisCoordinator
+from .entity import BudgetThuisContractEntity, BudgetThuisEntity, async_add_contract_entities
 from .structs.contract import Contract
-from .structs.hourly_tariff import HourlyTariff
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -84,91 +83,280 @@ SENSOR_TYPES: tuple[BudgetThuisEntityDescription, ...] = (
             "gross": data['current_tariff'].commodity.gross
         },
     ),
+    BudgetThuisEntityDescription(
+        key="cheapest_window_start",
+        name="Cheapest window start",
+        device_class=SensorDeviceClass.TIMESTAMP,
+        value_fn=lambda data: data['cheapest_window'].start,
+        attr_fn=lambda data: {
+            "end": data['cheapest_window'].end.isoformat(),
+        } if data['cheapest_window'] else {},
+    ),
+    BudgetThuisEntityDescription(
+        key="cheapest_window_average",
+        name="Cheapest window average price",
+        native_unit_of_measurement=f"{CURRENCY_EURO}/{UnitOfEnergy.KILO_WATT_HOUR}",
+        suggested_display_precision=2,
+        value_fn=lambda data: data['cheapest_window'].average_price,
+    ),
+    BudgetThuisEntityDescription(
+        key="cheapest_hours_average",
+        name="Cheapest hours average price",
+        native_unit_of_measurement=f"{CURRENCY_EURO}/{UnitOfEnergy.KILO_WATT_HOUR}",
+        suggested_display_precision=2,
+        value_fn=lambda data: data['cheapest_hours'].average_price,
+        attr_fn=lambda data: {
+            "hours": [start.isoformat() for start, _ in data['cheapest_hours'].periods],
+        } if data['cheapest_hours'] else {},
+    ),
+    # Read from the statistics the coordinator computes once per fetch.
+    BudgetThuisEntityDescription(
+        key="price_rank",
+        name="Current price rank",
+        icon="mdi:podium",
+        value_fn=lambda data: data['analytics'].rank,
+        attr_fn=lambda data: {
+            "periods": data['analytics'].day.periods,
+        } if data['analytics'] else {},
+    ),
+    BudgetThuisEntityDescription(
+        key="price_percentile",
+        name="Current price percentile",
+        native_unit_of_measurement=PERCENTAGE,
+        suggested_display_precision=0,
+        value_fn=lambda data: data['analytics'].percentile,
+    ),
+    BudgetThuisEntityDescription(
+        key="price_level",
+        name="Current price level",
+        device_class=SensorDeviceClass.ENUM,
+        options=[PRICE_LEVEL_CHEAP, PRICE_LEVEL_NORMAL, PRICE_LEVEL_EXPENSIVE],
+        value_fn=lambda data: data['analytics'].level,
+    ),
+    BudgetThuisEntityDescription(
+        key="day_min",
+        name="Lowest price today",
+        native_unit_of_measurement=f"{CURRENCY_EURO}/{UnitOfEnergy.KILO_WATT_HOUR}",
+        suggested_display_precision=2,
+        value_fn=lambda data: data['analytics'].day.min,
+    ),
+    BudgetThuisEntityDescription(
+        key="day_max",
+        name="Highest price today",
+        native_unit_of_measurement=f"{CURRENCY_EURO}/{UnitOfEnergy.KILO_WATT_HOUR}",
+        suggested_display_precision=2,
+        value_fn=lambda data: data['analytics'].day.max,
+    ),
+    BudgetThuisEntityDescription(
+        key="day_mean",
+        name="Average price today",
+        native_unit_of_measurement=f"{CURRENCY_EURO}/{UnitOfEnergy.KILO_WATT_HOUR}",
+        suggested_display_precision=2,
+        value_fn=lambda data: data['analytics'].day.mean,
+    ),
+    BudgetThuisEntityDescription(
+        key="average_deviation",
+        name="Current price deviation from 7-day average",
+        native_unit_of_measurement=f"{CURRENCY_EURO}/{UnitOfEnergy.KILO_WATT_HOUR}",
+        suggested_display_precision=2,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda data: data['analytics'].deviation,
+        attr_fn=lambda data: {
+            "average": data['analytics'].day.average,
+        } if data['analytics'] else {},
+    ),
+    # Only has a value when an energy sensor is configured in the options.
+    BudgetThuisEntityDescription(
+        key="electricity_cost",
+        name="Electricity cost",
+        device_class=SensorDeviceClass.MONETARY,
+        native_unit_of_measurement=CURRENCY_EURO,
+        suggested_display_precision=2,
+        state_class=SensorStateClass.TOTAL,
+        value_fn=lambda data: data['cost'].total,
+        attr_fn=lambda data: {
+            "last_hour": data['cost'].last_hour.isoformat(),
+            "last_hour_energy": data['cost'].last_hour_energy,
+            "last_hour_cost": data['cost'].last_hour_cost,
+        } if data['cost'] and data['cost'].last_hour else {},
+    ),
 )
 
 
-async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry, async_add_entities):
-    """Set up the Budget Thuis sensor platform."""
+@dataclass
+class BudgetThuisDiagnosticEntityDescription(SensorEntityDescription):
+    """Describes Budget Thuis diagnostic sensor entity, fed by the request instrumentation."""
+
+    value_fn: Callable[[BudgetThuisCoordinator], StateType] = None
+    attr_fn: Callable[[BudgetThuisCoordinator], dict[str, StateType | dict]] = lambda _: {}
 
-    coordinator = BudgetThuisCoordinator(hass)
 
-    await coordinator.async_config_entry_first_refresh()
+def _total(coordinator: BudgetThuisCoordinator, stat: str) -> float:
+    return sum(getattr(stats, stat) for stats in coordinator.endpoint_stats.values())
 
-    entities = []
 
-    # Loop through contracts and create sensors for each contract
-    for contract in coordinator.data:
-        for description in SENSOR_TYPES:
-            entities.append(
-                BudgetThuisSensor(coordinator, description, entry, contract)
-            )
+def _per_endpoint(coordinator: BudgetThuisCoordinator, stat: str) -> dict[str, StateType]:
+    return {endpoint: getattr(stats, stat) for endpoint, stats in coordinator.endpoint_stats.items()}
 
-    async_add_entities(entities, True)
 
+def _mean_latency(coordinator: BudgetThuisCoordinator) -> float | None:
+    histograms = [stats.latency for stats in coordinator.endpoint_stats.values()]
+    count = sum(histogram.count for histogram in histograms)
 
-class BudgetThuisSensor(CoordinatorEntity, SensorEntity):
+    return sum(histogram.total for histogram in histograms) / count if count else None
+
+
+DIAGNOSTIC_SENSOR_TYPES: tuple[BudgetThuisDiagnosticEntityDescription, ...] = (
+    BudgetThuisDiagnosticEntityDescription(
+        key="update_duration",
+        name="Last update duration",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.SECONDS,
+        suggested_display_precision=3,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda coordinator: coordinator.update_duration.last,
+        attr_fn=lambda coordinator: {
+            "updates": coordinator.update_duration.count,
+            "mean": coordinator.update_duration.mean,
+            "max": coordinator.update_duration.max,
+        },
+    ),
+    BudgetThuisDiagnosticEntityDescription(
+        key="api_requests",
+        name="API requests",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda coordinator: _total(coordinator, "requests"),
+        attr_fn=lambda coordinator: _per_endpoint(coordinator, "requests"),
+    ),
+    BudgetThuisDiagnosticEntityDescription(
+        key="api_retries",
+        name="API retries",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda coordinator: _total(coordinator, "retries"),
+        attr_fn=lambda coordinator: {"backoff_seconds": _total(coordinator, "backoff_seconds")},
+    ),
+    BudgetThuisDiagnosticEntityDescription(
+        key="api_errors",
+        name="API errors",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda coordinator: _total(coordinator, "errors"),
+        attr_fn=lambda coordinator: _per_endpoint(coordinator, "last_error"),
+    ),
+    BudgetThuisDiagnosticEntityDescription(
+        key="api_latency",
+        name="API average latency",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.SECONDS,
+        suggested_display_precision=3,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=_mean_latency,
+        attr_fn=lambda coordinator: {
+            endpoint: stats.latency.mean for endpoint, stats in coordinator.endpoint_stats.items()
+        },
+    ),
+    BudgetThuisDiagnosticEntityDescription(
+        key="api_bytes_received",
+        name="API bytes received",
+        device_class=SensorDeviceClass.DATA_SIZE,
+        native_unit_of_measurement=UnitOfInformation.BYTES,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda coordinator: _total(coordinator, "bytes_received"),
+        attr_fn=lambda coordinator: {"parse_seconds": _total(coordinator, "parse_seconds")},
+    ),
+)
+
+
+async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry, async_add_entities):
+    """Set up the Budget Thuis sensor platform."""
+
+    coordinator: BudgetThuisCoordinator = hass.data[DOMAIN][entry.entry_id]['coordinator']
+
+    # Request instrumentation, only useful while investigating slow refreshes.
+    async_add_entities(
+        BudgetThuisDiagnosticSensor(coordinator, description, entry) for description in DIAGNOSTIC_SENSOR_TYPES
+    )
+
+    async_add_contract_entities(coordinator, entry, async_add_entities, lambda contract: [
+        BudgetThuisSensor(coordinator, description, entry, contract) for description in SENSOR_TYPES
+    ])
+
+
+class BudgetThuisSensor(BudgetThuisContractEntity, SensorEntity):
     """Representation of a Budget Thuis sensor."""
 
     _attr_attribution = "Data provided by Budget Thuis"
     _attr_icon = "mdi:currency-eur"
+    # Lists of periods grow with the tariff horizon, keep them out of the database.
+    _unrecorded_attributes = frozenset({"hours"})
 
     def __init__(
             self,
             coordinator: BudgetThuisCoordinator,
             description: BudgetThuisEntityDescription,
             entry: ConfigEntry,
-            contract: dict[str, Contract | list[HourlyTariff]],
+            contract: Contract,
     ) -> None:
         """Initialize the sensor."""
         self.entity_description: BudgetThuisEntityDescription = description
-        self.contract = contract
-        self._attr_unique_id = f"{entry.unique_id}.{contract['contract'].id}.{description.key}"
+        super().__init__(coordinator, description, entry, contract)
 
-        self._attr_device_info = DeviceInfo(
-            identifiers={(DOMAIN, f"{entry.entry_id}", f"{contract['contract'].id}")},
-            name=f"{contract['contract'].id} - {contract['contract'].supplyAddress.street} {contract['contract'].supplyAddress.houseNumber} {contract['contract'].supplyAddress.houseNumberExtension if contract['contract'].supplyAddress.houseNumberExtension else ''}",
-            manufacturer="Budget Thuis",
-            entry_type=DeviceEntryType.SERVICE,
-            configuration_url="https://www.budgetthuis.nl",
-        )
+        self._update_state()
 
-        self._update_job = HassJob(self._handle_scheduled_update)
-        self._unsub_update = None
-
-        super().__init__(coordinator)
+    @property
+    def available(self) -> bool:
+        """Return if the current tariff of the contract is known."""
+        return super().available and self.contract is not None and self.contract['current_tariff'] is not None
 
-    async def async_update(self) -> None:
-        """Get the latest data and updates the states."""
+    def _update_state(self) -> None:
         try:
             # Pass contract-specific data to the value function
             self._attr_native_value = self.entity_description.value_fn(self.contract)
-        except (TypeError, IndexError, ValueError):
+        except (AttributeError, TypeError, IndexError, ValueError):
             # No data available
             self._attr_native_value = None
 
-        # Cancel the currently scheduled event if there is any
-        if self._unsub_update:
-            self._unsub_update()
-            self._unsub_update = None
+        # Pass contract-specific data to the attribute function
+        self._attr_extra_state_attributes = self.entity_description.attr_fn(self.contract) if self.available else {}
+
+
+class BudgetThuisDiagnosticSensor(BudgetThuisEntity, SensorEntity):
+    """Representation of a Budget Thuis request instrumentation sensor."""
 
-        # Schedule the next update at exactly the next whole hour sharp
-        self._unsub_update = event.async_track_point_in_utc_time(
-            self.hass,
-            self._update_job,
-            utcnow().replace(minute=0, second=0) + timedelta(hours=1),
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+    # The breakdowns change on every refresh and are only read live, not from history.
+    _unrecorded_attributes = frozenset({
+        "token", "userinfo", "productPicker", "hourlytariff", "updates", "mean", "max", "backoff_seconds",
+        "parse_seconds",
+    })
+
+    def __init__(
+            self,
+            coordinator: BudgetThuisCoordinator,
+            description: BudgetThuisDiagnosticEntityDescription,
+            entry: ConfigEntry,
+    ) -> None:
+        """Initialize the sensor."""
+        self.entity_description: BudgetThuisDiagnosticEntityDescription = description
+        self._attr_unique_id = f"{entry.entry_id}.{description.key}"
+
+        self._attr_device_info = DeviceInfo(
+            identifiers={(DOMAIN, f"{entry.entry_id}")},
+            name="Budget Thuis",
+            manufacturer="Budget Thuis",
+            entry_type=DeviceEntryType.SERVICE,
+            configuration_url="https://www.budgetthuis.nl",
         )
 
-    async def _handle_scheduled_update(self, _):
-        """Handle a scheduled update."""
-        # Only handle the scheduled update for entities which have a reference to hass,
-        # which disabled sensors don't have.
-        if self.hass is None:
-            return
+        super().__init__(coordinator)
 
-        self.async_schedule_update_ha_state(True)
+        self._update_state()
 
-    @property
-    def extra_state_attributes(self) -> dict[str, Any]:
-        """Return the state attributes."""
-        # Pass contract-specific data to the attribute function
-        return self.entity_description.attr_fn(self.contract)
+    def _update_state(self) -> None:
+        try:
+            self._attr_native_value = self.entity_description.value_fn(self.coordinator)
+            self._attr_extra_state_attributes = self.entity_description.attr_fn(self.coordinator)
+        except (AttributeError, KeyError, TypeError):
+            # The API clients are not set up yet
+            self._attr_native_value = None
+            self._attr_extra_state_attributes = {}
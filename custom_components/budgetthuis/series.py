@@ -0,0 +1,91 @@
+"""Price series over the cached tariff horizon."""
+from bisect import bisect_left
+from datetime import datetime, time, timedelta, tzinfo
+from typing import Any
+
+from .const import AGGREGATION_DAILY, AGGREGATION_HOURLY
+from .structs.tariff_timeline import TariffTimeline, from_epoch, to_epoch
+
+
+def _bucket_start(epoch: int, aggregation: str, time_zone: tzinfo) -> datetime:
+    local = from_epoch(epoch).astimezone(time_zone)
+
+    if aggregation == AGGREGATION_DAILY:
+        return datetime.combine(local.date(), time(), time_zone)
+
+    return local.replace(minute=0, second=0, microsecond=0)
+
+
+def _bucket_end(start: datetime, aggregation: str, time_zone: tzinfo) -> datetime:
+    if aggregation == AGGREGATION_DAILY:
+        # Local midnight, so days around a DST change are 23 or 25 hours long.
+        return datetime.combine(start.date() + timedelta(days=1), time(), time_zone)
+
+    return from_epoch(to_epoch(start) + 3600).astimezone(time_zone)
+
+
+def price_series(
+        timeline: TariffTimeline,
+        start: datetime,
+        end: datetime,
+        column: str = "total_gross",
+        aggregation: str | None = None,
+        time_zone: tzinfo | None = None
+) -> list[dict[str, Any]]:
+    """Return the prices of the periods overlapping [start, end).
+
+    With an hourly or daily aggregation the periods are grouped into local
+    hours or days, each with the mean, minimum and maximum price. Buckets are
+    found by bisecting the period starts, so only one pass over the prices is
+    made whatever the aggregation.
+    """
+    indices = timeline.index_range(start, end)
+    starts = timeline.starts
+    ends = timeline.ends
+    values = timeline.columns[column]
+
+    if aggregation not in (AGGREGATION_HOURLY, AGGREGATION_DAILY):
+        # Consecutive periods share boundaries, so every boundary is formatted once.
+        formatted: dict[int, str] = {}
+
+        def isoformat(epoch: int) -> str:
+            text = formatted.get(epoch)
+            if text is None:
+                text = formatted[epoch] = from_epoch(epoch).isoformat()
+            return text
+
+        return [
+            {"start": isoformat(starts[index]), "end": isoformat(ends[index]), "price": values[index]}
+            for index in indices
+        ]
+
+    series = []
+    index = indices.start
+    bucket_end: datetime | None = None
+    bucket_end_epoch = bucket_end_text = None
+
+    while index < indices.stop:
+        # Without a gap the next bucket starts where the previous one ended.
+        if starts[index] == bucket_end_epoch:
+            bucket_start, bucket_start_text = bucket_end, bucket_end_text
+        else:
+            bucket_start = _bucket_start(starts[index], aggregation, time_zone)
+            bucket_start_text = bucket_start.isoformat()
+
+        bucket_end = _bucket_end(bucket_start, aggregation, time_zone)
+        bucket_end_epoch = to_epoch(bucket_end)
+        bucket_end_text = bucket_end.isoformat()
+
+        stop = bisect_left(starts, bucket_end_epoch, index, indices.stop)
+        prices = values[index:stop]
+
+        series.append({
+            "start": bucket_start_text,
+            "end": bucket_end_text,
+            "price": sum(prices) / len(prices),
+            "min": min(prices),
+            "max": max(prices),
+        })
+        index = stop
+
+    return series
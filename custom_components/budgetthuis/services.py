@@ -0,0 +1,202 @@
+import logging
+import voluptuous as vol
+from datetime import datetime
+from homeassistant.core import HomeAssistant, ServiceCall, ServiceResponse, SupportsResponse
+from homeassistant.exceptions import ServiceValidationError
+from homeassistant.helpers import config_validation as cv
+from homeassistant.util import dt as dt_util
+
+from .backfill import async_get_archive, async_start_backfill
+from .const import (AGGREGATION_DAILY, AGGREGATION_HOURLY, AGGREGATION_NONE, ATTR_AGGREGATION, ATTR_AMOUNT,
+                    ATTR_COMPONENT, ATTR_CONFIG_ENTRY_ID, ATTR_CONTRACT_ID, ATTR_END, ATTR_HOURS, ATTR_START, DOMAIN,
+                    SERVICE_BACKFILL_TARIFFS, SERVICE_FIND_CHEAPEST_WINDOW, SERVICE_GET_TARIFFS,
+                    SERVICE_REFRESH_CONTRACTS)
+from .optimizer import cheapest_hours, cheapest_window
+from .series import price_series
+from .structs.tariff_timeline import AMOUNT_FIELDS, TARIFF_COMPONENTS
+
+_LOGGER = logging.getLogger(__name__)
+
+SERVICE_REFRESH_CONTRACTS_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_CONFIG_ENTRY_ID): cv.string,
+    }
+)
+
+SERVICE_FIND_CHEAPEST_WINDOW_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_CONFIG_ENTRY_ID): cv.string,
+        vol.Optional(ATTR_CONTRACT_ID): vol.Coerce(int),
+        vol.Required(ATTR_HOURS): vol.All(vol.Coerce(int), vol.Range(min=1, max=48)),
+        vol.Optional(ATTR_START): cv.datetime,
+        vol.Optional(ATTR_END): cv.datetime,
+    }
+)
+
+SERVICE_BACKFILL_TARIFFS_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_CONFIG_ENTRY_ID): cv.string,
+        vol.Optional(ATTR_CONTRACT_ID): vol.Coerce(int),
+        vol.Required(ATTR_START): cv.datetime,
+    }
+)
+
+SERVICE_GET_TARIFFS_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_CONFIG_ENTRY_ID): cv.string,
+        vol.Optional(ATTR_CONTRACT_ID): vol.Coerce(int),
+        vol.Optional(ATTR_START): cv.datetime,
+        vol.Optional(ATTR_END): cv.datetime,
+        vol.Optional(ATTR_COMPONENT, default="total"): vol.In(TARIFF_COMPONENTS),
+        vol.Optional(ATTR_AMOUNT, default="gross"): vol.In(AMOUNT_FIELDS),
+        vol.Optional(ATTR_AGGREGATION, default=AGGREGATION_NONE): vol.In(
+            [AGGREGATION_NONE, AGGREGATION_HOURLY, AGGREGATION_DAILY]
+        ),
+    }
+)
+
+
+def _entry_data(hass: HomeAssistant, call: ServiceCall) -> list[dict]:
+    """Return the data of the config entries targeted by a service call."""
+    domain_data = hass.data.get(DOMAIN, {})
+    entries = {
+        entry.entry_id: domain_data[entry.entry_id]
+        for entry in hass.config_entries.async_entries(DOMAIN)
+        if entry.entry_id in domain_data
+    }
+
+    if ATTR_CONFIG_ENTRY_ID not in call.data:
+        return list(entries.values())
+
+    if call.data[ATTR_CONFIG_ENTRY_ID] not in entries:
+        raise ServiceValidationError(f"Unknown Budget Thuis config entry {call.data[ATTR_CONFIG_ENTRY_ID]}")
+
+    return [entries[call.data[ATTR_CONFIG_ENTRY_ID]]]
+
+
+def _contracts(hass: HomeAssistant, call: ServiceCall) -> list[dict]:
+    """Return the coordinator data of the contracts targeted by a service call."""
+    contracts = [
+        contract
+        for entry_data in _entry_data(hass, call)
+        for contract_id, contract in entry_data['coordinator'].data.items()
+        if ATTR_CONTRACT_ID not in call.data or contract_id == call.data[ATTR_CONTRACT_ID]
+    ]
+
+    if ATTR_CONTRACT_ID in call.data and not contracts:
+        raise ServiceValidationError(f"Unknown Budget Thuis contract {call.data[ATTR_CONTRACT_ID]}")
+
+    return contracts
+
+
+def _as_utc(value: datetime | None) -> datetime | None:
+    """Convert a service datetime to UTC, naive values are in the local time zone."""
+    return dt_util.as_utc(value) if value is not None else None
+
+
+async def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the Budget Thuis services."""
+
+    async def async_refresh_contracts(call: ServiceCall) -> None:
+        for entry_data in _entry_data(hass, call):
+            await entry_data['coordinator'].async_refresh_contracts()
+
+    hass.services.async_register(
+        DOMAIN, SERVICE_REFRESH_CONTRACTS, async_refresh_contracts, schema=SERVICE_REFRESH_CONTRACTS_SCHEMA
+    )
+
+    async def async_find_cheapest_window(call: ServiceCall) -> ServiceResponse:
+        start = _as_utc(call.data.get(ATTR_START)) or dt_util.utcnow()
+        end = _as_utc(call.data.get(ATTR_END))
+        hours = call.data[ATTR_HOURS]
+        response = {}
+
+        # Answered from the cached timelines, no API requests are made.
+        for contract in _contracts(hass, call):
+            window = cheapest_window(contract['timeline'], hours, start, end)
+            cheapest = cheapest_hours(contract['timeline'], hours, start, end)
+
+            response[str(contract['contract'].id)] = {
+                "window": {
+                    "start": window.start.isoformat(),
+                    "end": window.end.isoformat(),
+                    "average_price": window.average_price,
+                } if window else None,
+                "cheapest_hours": {
+                    "hours": [
+                        {"start": period_start.isoformat(), "price": price}
+                        for period_start, price in cheapest.periods
+                    ],
+                    "average_price": cheapest.average_price,
+                } if cheapest else None,
+            }
+
+        return response
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_FIND_CHEAPEST_WINDOW,
+        async_find_cheapest_window,
+        schema=SERVICE_FIND_CHEAPEST_WINDOW_SCHEMA,
+        supports_response=SupportsResponse.ONLY
+    )
+
+    async def async_get_tariffs(call: ServiceCall) -> ServiceResponse:
+        start = _as_utc(call.data.get(ATTR_START)) or dt_util.utcnow()
+        end = _as_utc(call.data.get(ATTR_END))
+        column = f"{call.data[ATTR_COMPONENT]}_{call.data[ATTR_AMOUNT]}"
+        time_zone = dt_util.get_time_zone(hass.config.time_zone)
+
+        response = {}
+
+        # Answered from the cached timelines and the archive, no API requests are made.
+        for contract in _contracts(hass, call):
+            timeline = contract['timeline']
+            if timeline.first_start is None or start < timeline.first_start:
+                # Older than the cache, backfilled history is read from the archive.
+                timeline = await hass.async_add_executor_job(
+                    async_get_archive(hass, contract['contract'].id).with_history,
+                    timeline,
+                    start,
+                    timeline.first_start or end or dt_util.utcnow()
+                )
+
+            response[str(contract['contract'].id)] = {
+                "component": call.data[ATTR_COMPONENT],
+                "amount": call.data[ATTR_AMOUNT],
+                "aggregation": call.data[ATTR_AGGREGATION],
+                "prices": price_series(
+                    timeline,
+                    start,
+                    end or timeline.last_end or start,
+                    column,
+                    call.data[ATTR_AGGREGATION],
+                    time_zone
+                ),
+            }
+
+        return response
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_GET_TARIFFS,
+        async_get_tariffs,
+        schema=SERVICE_GET_TARIFFS_SCHEMA,
+        supports_response=SupportsResponse.ONLY
+    )
+
+    async def async_backfill_tariffs(call: ServiceCall) -> None:
+        start = _as_utc(call.data[ATTR_START])
+
+        for entry_data in _entry_data(hass, call):
+            coordinator = entry_data['coordinator']
+            for contract_id in coordinator.data:
+                if ATTR_CONTRACT_ID in call.data and contract_id != call.data[ATTR_CONTRACT_ID]:
+                    continue
+
+                if not async_start_backfill(hass, coordinator.config_entry, contract_id, start):
+                    _LOGGER.info("A tariff backfill of contract %d is already running", contract_id)
+
+    hass.services.async_register(
+        DOMAIN, SERVICE_BACKFILL_TARIFFS, async_backfill_tariffs, schema=SERVICE_BACKFILL_TARIFFS_SCHEMA
+    )
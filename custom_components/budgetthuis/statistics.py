@@ -0,0 +1,96 @@
+"""Import fetched tariffs into the long-term statistics of Home Assistant."""
+import logging
+from homeassistant.components.recorder import get_instance
+from homeassistant.components.recorder.models import StatisticData, StatisticMetaData
+from homeassistant.components.recorder.statistics import async_add_external_statistics, get_last_statistics
+from homeassistant.const import CURRENCY_EURO, UnitOfEnergy
+from homeassistant.core import HomeAssistant, callback
+
+from .const import DOMAIN
+from .structs.tariff_timeline import TARIFF_COMPONENTS, TariffTimeline, from_epoch
+
+_LOGGER = logging.getLogger(__name__)
+
+HOUR = 3600
+
+
+def statistic_id(contract_id: int, component: str) -> str:
+    return f"{DOMAIN}:contract_{contract_id}_electricity_{component}_price"
+
+
+@callback
+def async_import_tariff_statistics(hass: HomeAssistant, contract_id: int, timeline: TariffTimeline) -> None:
+    """Write the gross prices of a timeline as hourly external statistics.
+
+    Rows are upserted by their start, so importing overlapping periods again
+    is idempotent. Pass the freshly fetched horizon, not the whole cache.
+    """
+    if not len(timeline):
+        return
+
+    for component in TARIFF_COMPONENTS:
+        metadata = StatisticMetaData(
+            has_mean=True,
+            has_sum=False,
+            name=f"Budget Thuis {contract_id} electricity {component} price",
+            source=DOMAIN,
+            statistic_id=statistic_id(contract_id, component),
+            unit_of_measurement=f"{CURRENCY_EURO}/{UnitOfEnergy.KILO_WATT_HOUR}",
+        )
+
+        async_add_external_statistics(
+            hass, metadata, _hourly_statistics(timeline, f"{component}_gross")
+        )
+
+    _LOGGER.debug("Imported %d tariff periods of contract %d into statistics", len(timeline), contract_id)
+
+
+async def async_fill_tariff_statistics(hass: HomeAssistant, contract_id: int, timeline: TariffTimeline) -> None:
+    """Import the periods of a timeline after the last imported hour.
+
+    Covers tariffs which were fetched but never imported, for example
+    restored from a snapshot, without importing the whole history again.
+    """
+    if not len(timeline):
+        return
+
+    # All components are imported together, the total price stands in for them.
+    last = await get_instance(hass).async_add_executor_job(
+        get_last_statistics, hass, 1, statistic_id(contract_id, "total"), False, {"mean"}
+    )
+    rows = last.get(statistic_id(contract_id, "total"))
+    start = from_epoch(int(rows[0]["end"])) if rows else timeline.first_start
+
+    async_import_tariff_statistics(hass, contract_id, timeline.between(start, timeline.last_end))
+
+
+def _hourly_statistics(timeline: TariffTimeline, column: str) -> list[StatisticData]:
+    """Aggregate the periods of a timeline per whole hour."""
+    statistics: list[StatisticData] = []
+    values = timeline.columns[column]
+    hour_start = None
+    hour_values: list[float] = []
+
+    for start, value in zip(timeline.starts, values):
+        period_hour = start - start % HOUR
+
+        if period_hour != hour_start and hour_values:
+            statistics.append(_statistic(hour_start, hour_values))
+            hour_values = []
+
+        hour_start = period_hour
+        hour_values.append(value)
+
+    if hour_values:
+        statistics.append(_statistic(hour_start, hour_values))
+
+    return statistics
+
+
+def _statistic(hour_start: int, values: list[float]) -> StatisticData:
+    return StatisticData(
+        start=from_epoch(hour_start),
+        mean=sum(values) / len(values),
+        min=min(values),
+        max=max(values),
+    )
@@ -0,0 +1,105 @@
+import logging
+from array import array
+from dataclasses import asdict
+from datetime import datetime
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+
+from .const import DOMAIN
+from .structs.contract import Address, Contract
+from .structs.tariff_timeline import COLUMNS, TariffTimeline
+from .tariff_cache import TariffCache
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+STORAGE_SAVE_DELAY = 10
+
+
+class BudgetThuisStore:
+    """Persist the last known contracts and tariff horizons of a config entry."""
+
+    def __init__(self, hass: HomeAssistant, entry_id: str) -> None:
+        self._store = Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry_id}")
+
+    async def async_load(self) -> dict | None:
+        """Load the last snapshot, or None when there is no usable one."""
+        data = await self._store.async_load()
+
+        if not data:
+            return None
+
+        try:
+            tariff_caches: dict[int, TariffCache] = {}
+            for contract_id, cached in data['tariffs'].items():
+                tariff_caches[int(contract_id)] = TariffCache(
+                    _timeline_from_dict(cached),
+                    datetime.fromisoformat(cached['fetched_at'])
+                )
+
+            return {
+                'userinfo': data['userinfo'],
+                'userinfo_fetched_at': data['userinfo_fetched_at'],
+                'contracts': [_contract_from_dict(contract) for contract in data['contracts']],
+                'contracts_discovered_at': _datetime_from_str(data['contracts_discovered_at']),
+                'tariff_caches': tariff_caches,
+            }
+        except (KeyError, TypeError, ValueError) as exception:
+            _LOGGER.warning("Ignoring unreadable Budget Thuis snapshot: %s", exception)
+            return None
+
+    def async_schedule_save(
+            self,
+            userinfo: dict,
+            userinfo_fetched_at: float,
+            contracts: list[Contract],
+            contracts_discovered_at: datetime | None,
+            tariff_caches: dict[int, TariffCache]
+    ) -> None:
+        """Write a new snapshot to disk, batched with other saves."""
+        self._store.async_delay_save(
+            lambda: {
+                'userinfo': userinfo,
+                'userinfo_fetched_at': userinfo_fetched_at,
+                'contracts': [asdict(contract) for contract in contracts],
+                # None after a forced discovery failed, the next refresh discovers again.
+                'contracts_discovered_at': contracts_discovered_at.isoformat() if contracts_discovered_at else None,
+                'tariffs': {
+                    str(contract_id): {
+                        'fetched_at': cache.fetched_at.isoformat(),
+                        **_timeline_to_dict(cache.timeline),
+                    }
+                    for contract_id, cache in tariff_caches.items()
+                    if cache.fetched_at is not None
+                },
+            },
+            STORAGE_SAVE_DELAY
+        )
+
+    async def async_remove(self) -> None:
+        """Remove the snapshot from disk."""
+        await self._store.async_remove()
+
+
+def _datetime_from_str(value: str | None) -> datetime | None:
+    return datetime.fromisoformat(value) if value is not None else None
+
+
+def _contract_from_dict(data: dict) -> Contract:
+    return Contract(**{**data, 'supplyAddress': Address(**data['supplyAddress'])})
+
+
+def _timeline_to_dict(timeline: TariffTimeline) -> dict:
+    return {
+        'starts': timeline.starts.tolist(),
+        'ends': timeline.ends.tolist(),
+        'columns': {column: timeline.columns[column].tolist() for column in COLUMNS},
+    }
+
+
+def _timeline_from_dict(data: dict) -> TariffTimeline:
+    return TariffTimeline(
+        array('q', data['starts']),
+        array('q', data['ends']),
+        {column: array('d', data['columns'][column]) for column in COLUMNS}
+    )
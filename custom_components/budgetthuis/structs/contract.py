@@ -1,7 +1,7 @@
 from dataclasses import dataclass
 
 
-@dataclass
+@dataclass(slots=True)
 class Address:
     zipCode: str
     houseNumber: int
@@ -10,7 +10,7 @@ class Address:
     street: str
 
 
-@dataclass
+@dataclass(slots=True)
 class Contract:
     id: int
     relationId: int
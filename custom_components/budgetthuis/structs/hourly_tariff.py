@@ -2,14 +2,14 @@ from dataclasses import dataclass
 from datetime import datetime
 
 
-@dataclass
+@dataclass(slots=True)
 class AmountDetails:
     net: float
     vat: float
     gross: float
 
 
-@dataclass
+@dataclass(slots=True)
 class HourlyTariff:
     total: AmountDetails
     tax: AmountDetails
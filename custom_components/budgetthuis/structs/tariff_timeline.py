@@ -0,0 +1,217 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Sequence
+from datetime import datetime, timezone
+
+from .hourly_tariff import AmountDetails, HourlyTariff
+
+TARIFF_COMPONENTS: tuple[str, ...] = ("total", "tax", "surcharge", "commodity")
+AMOUNT_FIELDS: tuple[str, ...] = ("net", "vat", "gross")
+COLUMNS: tuple[str, ...] = tuple(
+    f"{component}_{field}" for component in TARIFF_COMPONENTS for field in AMOUNT_FIELDS
+)
+
+
+def to_epoch(when: datetime) -> int:
+    return int(when.timestamp())
+
+
+def from_epoch(epoch: int) -> datetime:
+    return datetime.fromtimestamp(epoch, timezone.utc)
+
+
+def _extend(target: array, values: array | memoryview) -> None:
+    view = memoryview(values)
+
+    # Views on an archive are strided and can't be copied as one block of bytes.
+    if view.c_contiguous:
+        target.frombytes(view.cast('B'))
+    else:
+        target.extend(view)
+
+
+def _copy(values: array | memoryview, typecode: str, start: int, stop: int) -> array:
+    copied = array(typecode)
+    _extend(copied, memoryview(values)[start:stop])
+    return copied
+
+
+class TariffTimeline:
+    """Tariff periods stored as sorted epoch boundaries with one price column per amount.
+
+    Every period costs 16 bytes of int64 boundaries plus 8 bytes per price
+    column, without any per-period Python objects. Lookups bisect the boundary
+    arrays, so point and range queries stay O(log n) no matter how much history
+    is kept. Range views share the buffers of the timeline they were taken from.
+    """
+
+    __slots__ = ("starts", "ends", "columns")
+
+    def __init__(
+            self,
+            starts: array | memoryview,
+            ends: array | memoryview,
+            columns: dict[str, array | memoryview]
+    ) -> None:
+        self.starts = starts
+        self.ends = ends
+        self.columns = columns
+
+    @classmethod
+    def empty(cls) -> "TariffTimeline":
+        return cls(array('q'), array('q'), {column: array('d') for column in COLUMNS})
+
+    @classmethod
+    def from_tariffs(cls, tariffs: list[HourlyTariff]) -> "TariffTimeline":
+        timeline = cls.empty()
+
+        for tariff in sorted(tariffs, key=lambda item: item.periodFrom):
+            timeline.starts.append(to_epoch(tariff.periodFrom))
+            timeline.ends.append(to_epoch(tariff.periodTo))
+            for component in TARIFF_COMPONENTS:
+                details: AmountDetails = getattr(tariff, component)
+                for field in AMOUNT_FIELDS:
+                    timeline.columns[f"{component}_{field}"].append(getattr(details, field))
+
+        return timeline
+
+    def append(self, start: int, end: int, prices: Sequence[float]) -> None:
+        """Add a period at the end, with its prices in the order of COLUMNS."""
+        self.starts.append(start)
+        self.ends.append(end)
+        for column, price in zip(COLUMNS, prices):
+            self.columns[column].append(price)
+
+    def sort(self) -> "TariffTimeline":
+        """Return the timeline ordered by period start, parsers may append out of order."""
+        if all(self.starts[index] <= self.starts[index + 1] for index in range(len(self.starts) - 1)):
+            return self
+
+        order = sorted(range(len(self.starts)), key=self.starts.__getitem__)
+
+        return TariffTimeline(
+            array('q', (self.starts[index] for index in order)),
+            array('q', (self.ends[index] for index in order)),
+            {column: array('d', (values[index] for index in order)) for column, values in self.columns.items()}
+        )
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    @property
+    def first_start(self) -> datetime | None:
+        return from_epoch(self.starts[0]) if self.starts else None
+
+    @property
+    def last_end(self) -> datetime | None:
+        return from_epoch(self.ends[-1]) if self.ends else None
+
+    def index_at(self, when: datetime) -> int | None:
+        """Return the index of the period which contains the given moment."""
+        epoch = to_epoch(when)
+        index = bisect_right(self.starts, epoch) - 1
+
+        if index >= 0 and epoch < self.ends[index]:
+            return index
+
+        return None
+
+    def index_range(self, start: datetime, end: datetime) -> range:
+        """Return the indices of the periods overlapping [start, end)."""
+        return range(
+            bisect_right(self.ends, to_epoch(start)),
+            bisect_left(self.starts, to_epoch(end))
+        )
+
+    def tariff(self, index: int) -> HourlyTariff:
+        """Build the HourlyTariff of a single period."""
+        return HourlyTariff(
+            **{
+                component: AmountDetails(
+                    **{field: self.columns[f"{component}_{field}"][index] for field in AMOUNT_FIELDS}
+                )
+                for component in TARIFF_COMPONENTS
+            },
+            periodFrom=from_epoch(self.starts[index]),
+            periodTo=from_epoch(self.ends[index]),
+        )
+
+    def at(self, when: datetime) -> HourlyTariff | None:
+        """Return the tariff which applies at the given moment."""
+        index = self.index_at(when)
+
+        return self.tariff(index) if index is not None else None
+
+    def price_at(self, when: datetime, column: str = "total_gross") -> float | None:
+        index = self.index_at(when)
+
+        return self.columns[column][index] if index is not None else None
+
+    def prices(self, start: datetime, end: datetime, column: str = "total_gross") -> list[tuple[datetime, float]]:
+        """Return (period start, price) pairs for the periods overlapping [start, end)."""
+        indices = self.index_range(start, end)
+        values = self.columns[column]
+
+        return [(from_epoch(self.starts[index]), values[index]) for index in indices]
+
+    def between(self, start: datetime, end: datetime) -> "TariffTimeline":
+        """Return a read-only view on the periods overlapping [start, end), without copying."""
+        indices = self.index_range(start, end)
+
+        return TariffTimeline(
+            memoryview(self.starts)[indices.start:indices.stop],
+            memoryview(self.ends)[indices.start:indices.stop],
+            {column: memoryview(values)[indices.start:indices.stop] for column, values in self.columns.items()}
+        )
+
+    def next_change(self, after: datetime) -> datetime | None:
+        """Return the first period boundary strictly after the given moment."""
+        epoch = to_epoch(after)
+        candidates = []
+
+        index = bisect_right(self.starts, epoch)
+        if index < len(self.starts):
+            candidates.append(self.starts[index])
+
+        current = index - 1
+        if current >= 0 and self.ends[current] > epoch:
+            candidates.append(self.ends[current])
+
+        return from_epoch(min(candidates)) if candidates else None
+
+    def merge(self, newer: "TariffTimeline", keep_from: datetime | None = None) -> "TariffTimeline":
+        """Combine with a newer timeline; newer periods replace overlapping older ones."""
+        keep = bisect_right(self.ends, newer.starts[0]) if len(newer) else len(self)
+        merged = self.copy(0, keep)
+        _extend(merged.starts, newer.starts)
+        _extend(merged.ends, newer.ends)
+        for column in COLUMNS:
+            _extend(merged.columns[column], newer.columns[column])
+
+        if keep_from is not None:
+            merged = merged.copy(bisect_right(merged.ends, to_epoch(keep_from)), len(merged))
+
+        return merged
+
+    def ends_with(self, newer: "TariffTimeline") -> bool:
+        """Return whether merging a newer timeline would leave the periods as they are."""
+        if not len(newer):
+            return True
+
+        keep = bisect_right(self.ends, newer.starts[0])
+
+        return (
+            memoryview(self.starts)[keep:] == memoryview(newer.starts)
+            and memoryview(self.ends)[keep:] == memoryview(newer.ends)
+            and all(memoryview(self.columns[column])[keep:] == memoryview(newer.columns[column]) for column in COLUMNS)
+        )
+
+    def copy(self, start: int = 0, stop: int | None = None) -> "TariffTimeline":
+        """Return an owned, appendable copy of a range of periods."""
+        stop = len(self) if stop is None else stop
+
+        return TariffTimeline(
+            _copy(self.starts, 'q', start, stop),
+            _copy(self.ends, 'q', start, stop),
+            {column: _copy(values, 'd', start, stop) for column, values in self.columns.items()}
+        )
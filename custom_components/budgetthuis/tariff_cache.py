@@ -0,0 +1,132 @@
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable, Iterable
+from datetime import datetime, timedelta
+from homeassistant.util import dt as dt_util
+
+from .const import (TARIFF_HISTORY_RETENTION, TARIFF_HORIZON_MARGIN, TARIFF_PUBLICATION_TIME,
+                    TARIFF_RETRY_INTERVAL, TARIFF_TIME_ZONE)
+from .structs.hourly_tariff import HourlyTariff
+from .structs.tariff_timeline import TariffTimeline
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class TariffCache:
+    """Keep the fetched tariff horizon and recent history of a single contract."""
+
+    def __init__(self, timeline: TariffTimeline | None = None, fetched_at: datetime | None = None) -> None:
+        self.timeline = timeline if timeline is not None else TariffTimeline.empty()
+        # When the tariffs last changed, and when the API was last asked for them.
+        self.fetched_at = fetched_at
+        self.checked_at = fetched_at
+        # The horizon of the last fetch, which is all that changed in the timeline.
+        self.last_fetched = TariffTimeline.empty()
+
+    @property
+    def horizon_end(self) -> datetime | None:
+        """Return the end of the last cached tariff period."""
+        return self.timeline.last_end
+
+    def update(self, tariffs: TariffTimeline, now: datetime) -> bool:
+        """Merge a freshly fetched horizon into the cached timeline and return whether it changed.
+
+        A 304 or an unchanged body leaves the timeline, and so everything
+        derived from it, as it was.
+        """
+        self.checked_at = now
+        if self.timeline.ends_with(tariffs):
+            return False
+
+        self.timeline = self.timeline.merge(tariffs, keep_from=now - TARIFF_HISTORY_RETENTION)
+        self.fetched_at = now
+        self.last_fetched = tariffs
+
+        return True
+
+    def current(self, now: datetime) -> HourlyTariff | None:
+        """Return the tariff which applies at the given moment."""
+        return self.timeline.at(now)
+
+    def needs_refresh(self, now: datetime) -> bool:
+        """Return whether the horizon has to be fetched again."""
+        if self.checked_at is None or not len(self.timeline):
+            return True
+
+        if self.horizon_end - now <= TARIFF_HORIZON_MARGIN:
+            _LOGGER.debug("Tariff horizon ends at %s, refreshing", self.horizon_end)
+            return True
+
+        local_now = now.astimezone(dt_util.get_time_zone(TARIFF_TIME_ZONE))
+        publication = datetime.combine(local_now.date(), TARIFF_PUBLICATION_TIME, local_now.tzinfo)
+        tomorrow_end = datetime.combine(local_now.date() + timedelta(days=2), datetime.min.time(), local_now.tzinfo)
+
+        if local_now < publication or self.horizon_end >= tomorrow_end:
+            return False
+
+        # Tomorrow's prices should be published by now; retry until they show up.
+        return self.checked_at < publication or now - self.checked_at >= TARIFF_RETRY_INTERVAL
+
+
+class SharedTariffCaches:
+    """Tariff caches of all config entries, keyed by contract id.
+
+    Config entries which share a contract share its cache, and concurrent
+    refreshes of the same contract wait for a single in-flight request.
+    """
+
+    def __init__(self) -> None:
+        self.caches: dict[int, TariffCache] = {}
+        self._inflight: dict[int, asyncio.Task] = {}
+
+    def restore(self, caches: dict[int, TariffCache]) -> None:
+        """Add the caches of a stored snapshot, keeping whichever copy was fetched last."""
+        for contract_id, cache in caches.items():
+            current = self.caches.get(contract_id)
+            if current is None or current.fetched_at is None or (
+                    cache.fetched_at is not None and cache.fetched_at > current.fetched_at
+            ):
+                self.caches[contract_id] = cache
+
+    def prune(self, contract_ids: Iterable[int]) -> None:
+        """Drop the caches of contracts no config entry has anymore."""
+        for contract_id in set(self.caches) - set(contract_ids):
+            del self.caches[contract_id]
+
+    async def async_refresh(
+            self,
+            contract_id: int,
+            now: datetime,
+            fetch: Callable[[], Awaitable[TariffTimeline]]
+    ) -> TariffCache:
+        """Fetch the tariffs of a contract when its cache needs it, once for all callers."""
+        cache = self.caches.setdefault(contract_id, TariffCache())
+
+        task = self._inflight.get(contract_id)
+        if task is None:
+            if not cache.needs_refresh(now):
+                _LOGGER.debug("Using cached tariffs for contract %d until %s", contract_id, cache.horizon_end)
+                return cache
+
+            task = self._inflight[contract_id] = asyncio.create_task(self._async_fetch(contract_id, now, fetch))
+        else:
+            _LOGGER.debug("Joining the in-flight tariff request of contract %d", contract_id)
+
+        # Shielded, so one caller giving up doesn't cancel the request for the others.
+        await asyncio.shield(task)
+
+        return self.caches[contract_id]
+
+    async def _async_fetch(
+            self,
+            contract_id: int,
+            now: datetime,
+            fetch: Callable[[], Awaitable[TariffTimeline]]
+    ) -> None:
+        try:
+            tariffs = await fetch()
+            _LOGGER.debug("Found %d tariff entries for contract %d", len(tariffs), contract_id)
+            if not self.caches.setdefault(contract_id, TariffCache()).update(tariffs, now):
+                _LOGGER.debug("Tariffs of contract %d are unchanged", contract_id)
+        finally:
+            del self._inflight[contract_id]